@@ -2,13 +2,15 @@ import streamlit as st
 import datetime
 import pandas as pd
 import os
+import concurrent.futures
 import gold_loader
 import gold_processor
 import charts
-import importlib
-importlib.reload(gold_loader)
-importlib.reload(gold_processor)
-importlib.reload(charts)
+import portfolio
+import window_index
+import sync_engine
+import sync_daemon
+import profiling
 
 # Set page config
 st.set_page_config(
@@ -23,186 +25,384 @@ This dashboard allows you to benchmark major global assets against **Gold**.
 By stripping away fiat currency volatility, we can see the *true* purchasing power performance of assets.
 """)
 
-# --- Sidebar ---
-st.sidebar.header("Configuration")
-
-# Date Range
-default_start = datetime.date.today() - datetime.timedelta(days=365*20)
-default_end = datetime.date.today()
-
-start_date = st.sidebar.date_input("Start Date", default_start)
-end_date = st.sidebar.date_input("End Date", default_end)
-
-if start_date >= end_date:
-    st.sidebar.error("Error: End Date must be after Start Date.")
-    st.stop()
-
-# Asset Selection
-st.sidebar.subheader("Select Assets")
-ticker_map = gold_loader.get_ticker_map()
-all_assets = sorted(list(ticker_map.keys()))
-
-# Cache Status
-if os.path.exists(gold_loader.ASSETS_DIR):
-    files = [f for f in os.listdir(gold_loader.ASSETS_DIR) if f.endswith('.csv')]
-    if files:
-        # Get the latest modified file in the directory
-        latest_file = max([os.path.join(gold_loader.ASSETS_DIR, f) for f in files], key=os.path.getmtime)
-        mtime = os.path.getmtime(latest_file)
-        last_updated = datetime.datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M')
-        st.sidebar.caption(f"📂 Local cache ({len(files)} assets) last updated: {last_updated}")
-    else:
+# Per-rerun timing spans (shown in the sidebar panel at the bottom when enabled)
+perf_run = profiling.start_run(profile=st.session_state.get("capture_profile", False))
+cache_stats_before = gold_loader.get_cache_stats()
+
+# The run is finished (profiler stopped, spans logged) however the page ends: st.stop()
+# and errors included
+try:
+    # --- Sidebar ---
+    st.sidebar.header("Configuration")
+
+    # Date Range
+    default_start = datetime.date.today() - datetime.timedelta(days=365*20)
+    default_end = datetime.date.today()
+
+    start_date = st.sidebar.date_input("Start Date", default_start)
+    end_date = st.sidebar.date_input("End Date", default_end)
+
+    if start_date >= end_date:
+        st.sidebar.error("Error: End Date must be after Start Date.")
+        st.stop()
+
+    # Charts are downsampled to about one point per pixel; narrowing the date range
+    # (or this toggle) brings back full daily detail
+    full_detail = st.sidebar.toggle("Full-resolution charts", value=False, help="Send every data point to the browser (slower for long date ranges)")
+    max_points = None if full_detail else charts.MAX_POINTS
+
+    # Asset Selection
+    st.sidebar.subheader("Select Assets")
+    ticker_map = gold_loader.get_ticker_map()
+    all_assets = sorted(list(ticker_map.keys()))
+
+    # Cache Status (read from the catalog; files it does not describe yet are catalogued once)
+    daily_entries = [
+        e for e in map(gold_loader.stored_entry, sorted(set(ticker_map.values()) - {"USD"})) if e is not None
+    ]
+    if daily_entries:
+        last_updated = max(e["last_sync"] for e in daily_entries)[:16].replace("T", " ")
+        total_rows = sum(e["rows"] for e in daily_entries)
+        st.sidebar.caption(f"📂 Local cache ({len(daily_entries)} assets, {total_rows:,} bars) last updated: {last_updated}")
+    elif os.path.exists(gold_loader.ASSETS_DIR):
         st.sidebar.caption("📂 Local cache folder empty.")
-else:
-    st.sidebar.caption("📂 No local cache found.")
-
-# Default selection (robust check)
-desired_defaults = ["SP500", "NIFTY", "SILVER", "USD", "INR"]
-default_assets = [a for a in desired_defaults if a in all_assets]
-
-selected_assets = st.sidebar.multiselect("Assets to Compare", all_assets, default=default_assets)
-
-if not selected_assets:
-    st.warning("Please select at least one asset to compare.")
-    st.stop()
-    
-# Always include Gold for calculation purposes (it is the denominator)
-fetch_list = set(selected_assets)
-fetch_list.add("GOLD")
-
-# Add dependent currencies if indices are selected
-deps = {
-    "NIFTY": "INR",
-    "NIKKEI": "JPY",
-}
-
-final_fetch_list = set(fetch_list)
-for asset in fetch_list:
-    if asset in deps:
-        final_fetch_list.add(deps[asset])
-
-# --- Data Loading / Refreshing ---
-
-# Persistent state for raw data
-if 'raw_df' not in st.session_state:
-    st.session_state.raw_df = pd.DataFrame()
-
-# Build complete ordered fetch list: base assets first, then selected assets
-# Base assets = GOLD + any currency dependencies
-base_assets = ["GOLD"]
-for asset in selected_assets:
-    if asset in deps and deps[asset] not in base_assets:
-        base_assets.append(deps[asset])
-
-# Selected assets (excluding GOLD, USD, and already-in-base currencies)
-asset_queue = [a for a in selected_assets if a not in base_assets and a != "USD"]
-all_to_load = base_assets + asset_queue
-total_steps = len(all_to_load)
-
-# Add Refresh Button to the Sidebar
-st.sidebar.divider()
-refresh_clicked = st.sidebar.button("🔄 Refresh Data", type="primary", use_container_width=True, help="Fetch latest data from Yahoo Finance into local cache")
-
-if refresh_clicked:
-    progress_bar = st.progress(0, text="Preparing to refresh data...")
-    status_container = st.empty()
-    
-    for step_idx, asset_name in enumerate(all_to_load):
-        ticker = gold_loader.get_ticker_map().get(asset_name)
-        if not ticker: continue
-        
-        progress_pct = (step_idx) / total_steps
-        progress_bar.progress(progress_pct, text=f"Fetching {asset_name} ({step_idx + 1}/{total_steps})...")
-        
-        with status_container.status(f"Syncing {asset_name}...") as s:
-            gold_loader.fetch_data_with_persistence([ticker], start_date, end_date)
-            s.update(label=f"✅ {asset_name} synced", state="complete")
-            
-    progress_bar.empty()
-    status_container.empty()
-
-# Always read what's currently in cache for the required tickers
-all_tickers = [gold_loader.get_ticker_map().get(a) for a in all_to_load if gold_loader.get_ticker_map().get(a)]
-st.session_state.raw_df = gold_loader.get_close_prices(all_tickers, start_date, end_date)
-
-successfully_loaded = []
-gold_ticker = gold_loader.get_ticker_map()["GOLD"]
-
-# Validate that GOLD loaded successfully (required for everything else)
-if gold_ticker not in st.session_state.raw_df.columns or st.session_state.raw_df[gold_ticker].isna().all():
-    st.error("⚠️ **Gold data (GC=F) is currently unavailable in the local cache.**")
-    st.info("Please click the '🔄 Refresh Data' button in the sidebar to download data from Yahoo Finance.")
-    st.stop()
-else:
-    # Track successfully loaded selected assets
-    for asset_name in selected_assets:
-        if asset_name == "GOLD": continue
-        t = gold_loader.get_ticker_map().get(asset_name)
-        if t and t in st.session_state.raw_df.columns and not st.session_state.raw_df[t].isna().all():
-            successfully_loaded.append(asset_name)
-
-# USD is synthetic — always available
-if "USD" in selected_assets:
-    successfully_loaded.append("USD")
-
-# --- Render Charts (single pass) ---
-
-if not st.session_state.raw_df.empty:
-    st.sidebar.success(f"✅ Active: {', '.join(successfully_loaded)}")
-else:
-    st.sidebar.warning("No data in session state.")
-
-if successfully_loaded:
-    try:
-        render_friendly = list(set(base_assets + successfully_loaded))
-        current_ticker_map = {
-            a: gold_loader.get_ticker_map()[a]
-            for a in render_friendly
-            if a in gold_loader.get_ticker_map()
-        }
-
-        normalized_df, metrics_df = gold_processor.process_data(
-            st.session_state.raw_df,
-            current_ticker_map,
-            gold_loader.CURRENCY_MAPPING,
-        )
-
-        display_cols = [c for c in selected_assets if c in normalized_df.columns]
+    else:
+        st.sidebar.caption("📂 No local cache found.")
+
+    # Window metrics (summary table, CAGR by year) are answered from an index over the
+    # full stored history, so moving the date range only queries it
+    HISTORY_START = datetime.date(1900, 1, 1)
+
+    # Largest allocation grid the portfolio backtest evaluates in one pass
+    MAX_PORTFOLIOS = 2000
+
+    # Background sync: poll the version file published by sync_daemon.py and rerun the
+    # page (re-reading only the changed assets) when it moves
+    SYNC_POLL_SECONDS = 60
+
+    @st.fragment(run_every=SYNC_POLL_SECONDS)
+    def watch_background_sync():
+        state = sync_daemon.read_state()
+        seen = st.session_state.setdefault("sync_version", state["version"])
+        if state["version"] > seen:
+            st.session_state.sync_version = state["version"]
+            gold_loader.invalidate_assets(sync_daemon.changed_since(state, seen))
+            st.rerun()
+        if state["last_run"]:
+            st.caption(f"🛰️ Auto-sync v{state['version']}: last run {state['last_run'][:16].replace('T', ' ')}")
+
+    with st.sidebar:
+        watch_background_sync()
+
+    # Default selection (robust check)
+    desired_defaults = ["SP500", "NIFTY", "SILVER", "USD", "INR"]
+    default_assets = [a for a in desired_defaults if a in all_assets]
+
+    selected_assets = st.sidebar.multiselect("Assets to Compare", all_assets, default=default_assets)
+
+    if not selected_assets:
+        st.warning("Please select at least one asset to compare.")
+        st.stop()
+
+    # Every denominator is priced in one pass, so switching here only re-slices the result
+    denominator = st.sidebar.selectbox(
+        "Price in", gold_processor.DENOMINATORS,
+        help="Denominator the assets are measured against (USD shows plain dollar prices)",
+    )
+
+    # --- Data Loading / Refreshing ---
+
+    # Persistent state for raw data
+    if 'raw_df' not in st.session_state:
+        st.session_state.raw_df = pd.DataFrame()
+
+    # Build complete ordered fetch list: base assets first, then selected assets
+    # Base assets = the denominators (GOLD first) + every FX series needed to reach USD
+    base_assets = [d for d in gold_processor.DENOMINATORS if d != "USD"]
+    for asset in gold_loader.get_required_fx_assets(selected_assets + base_assets):
+        if asset not in base_assets:
+            base_assets.append(asset)
+
+    # Selected assets (excluding GOLD, USD, and already-in-base currencies)
+    asset_queue = [a for a in selected_assets if a not in base_assets and a != "USD"]
+    all_to_load = base_assets + asset_queue
+
+    # Add Refresh Button to the Sidebar
+    st.sidebar.divider()
+    refresh_clicked = st.sidebar.button("🔄 Refresh Data", type="primary", use_container_width=True, help="Fetch latest data from Yahoo Finance into local cache")
+
+    if refresh_clicked:
+        progress_bar = st.progress(0, text="Preparing to refresh data...")
+        names_by_ticker = {gold_loader.get_ticker_map()[a]: a for a in all_to_load if a in gold_loader.get_ticker_map()}
+        synced = []
+
+        def on_synced(ticker, error):
+            synced.append(ticker)
+            icon = "❌" if error is not None else "✅"
+            progress_bar.progress(
+                len(synced) / max(len(names_by_ticker), 1),
+                text=f"{icon} {names_by_ticker[ticker]} synced ({len(synced)}/{len(names_by_ticker)})",
+            )
 
-        if display_cols:
-            final_ts_df = normalized_df[display_cols]
-            final_metrics_df = metrics_df.loc[display_cols]
+        # Tickers are fetched concurrently behind the shared rate limiter
+        sync_engine.sync_assets(list(names_by_ticker), start_date, end_date, on_done=on_synced)
+        progress_bar.empty()
+
+    # Always read what's currently in cache for the required tickers: the base series
+    # (denominators, FX) first, then one selected asset at a time. The performance chart
+    # is drawn once GOLD and the first assets are in and gains a line per asset, so the
+    # time to the first chart does not grow with the number of assets selected.
+    all_tickers = [gold_loader.get_ticker_map().get(a) for a in all_to_load if gold_loader.get_ticker_map().get(a)]
+    names_by_ticker = {gold_loader.get_ticker_map()[a]: a for a in all_to_load if a in gold_loader.get_ticker_map()}
+    base_tickers = [gold_loader.get_ticker_map()[a] for a in base_assets if a in gold_loader.get_ticker_map()]
+    load_bar = st.empty()
+    performance_header, performance_slot = st.empty(), st.empty()
+    loaded = set()
+    preview = {}
+
+    def on_loaded(ticker):
+        loaded.add(ticker)
+        load_bar.progress(
+            len(loaded) / max(len(all_tickers), 1),
+            text=f"📥 {names_by_ticker.get(ticker, ticker)} loaded ({len(loaded)}/{len(all_tickers)})",
+        )
 
-            st.subheader("📈 Performance vs Gold")
-            st.plotly_chart(
-                charts.plot_normalized_performance(final_ts_df), use_container_width=True
-            )
+    def draw_preview(raw):
+        """Adds the selected assets now present in `raw` to the performance chart."""
+        ready = [a for a in selected_assets if a not in preview and (a == "USD" or ticker_map.get(a) in raw.columns)]
+        if not ready:
+            return
+        try:
+            part = gold_processor.process_denominated(
+                raw, {a: ticker_map[a] for a in base_assets + ready if a in ticker_map},
+                gold_loader.CURRENCY_MAPPING, gold_loader.FX_PAIRS, assets=ready, denominators=[denominator],
+            )[denominator].normalized
+        except (ValueError, KeyError):
+            return  # GOLD / the denominator is not loaded (yet): the full pass reports it
+        preview.update(part.items())
+        with profiling.span("render.preview"):
+            performance_header.subheader(f"📈 Performance vs {denominator}")
+            performance_slot.plotly_chart(charts.plot_normalized_performance(
+                pd.DataFrame(preview)[[a for a in selected_assets if a in preview]],
+                title=f"Priced in {denominator} (Indexed to 100)", max_points=max_points, denominator=denominator,
+            ), use_container_width=True)
+
+    draw_preview(gold_loader.get_close_prices(base_tickers, start_date, end_date, on_loaded=on_loaded))
+    for asset in asset_queue:
+        if asset in ticker_map:
+            draw_preview(gold_loader.get_close_prices(base_tickers + [ticker_map[asset]], start_date, end_date, on_loaded=on_loaded))
+    # Every column is in memory now, so the combined frame is only a slice
+    st.session_state.raw_df = gold_loader.get_close_prices(all_tickers, start_date, end_date)
+    load_bar.empty()
+
+    successfully_loaded = []
+    gold_ticker = gold_loader.get_ticker_map()["GOLD"]
+
+    # Validate that GOLD loaded successfully (required for everything else)
+    if gold_ticker not in st.session_state.raw_df.columns or st.session_state.raw_df[gold_ticker].isna().all():
+        st.error("⚠️ **Gold data (GC=F) is currently unavailable in the local cache.**")
+        st.info("Please click the '🔄 Refresh Data' button in the sidebar to download data from Yahoo Finance.")
+        st.stop()
+    else:
+        # Track successfully loaded selected assets
+        for asset_name in selected_assets:
+            if asset_name == "GOLD": continue
+            t = gold_loader.get_ticker_map().get(asset_name)
+            if t and t in st.session_state.raw_df.columns and not st.session_state.raw_df[t].isna().all():
+                successfully_loaded.append(asset_name)
 
-            col1, col2 = st.columns(2)
-            with col1:
-                st.subheader("📉 Drawdowns")
-                st.plotly_chart(
-                    charts.plot_drawdown_heatmap(final_ts_df), use_container_width=True
-                )
-            with col2:
-                st.subheader("📊 Correlation Matrix")
-                st.plotly_chart(
-                    charts.plot_correlation_heatmap(final_ts_df), use_container_width=True
-                )
+    # USD is synthetic — always available
+    if "USD" in selected_assets:
+        successfully_loaded.append("USD")
 
-            st.subheader("⚡ Rolling Volatility (30D)")
-            st.plotly_chart(
-                charts.plot_rolling_vol(final_ts_df), use_container_width=True
-            )
+    # --- Render Charts (single pass) ---
 
-            st.subheader("📋 Summary Statistics")
-            st.dataframe(
-                final_metrics_df.style.format("{:.2%}"), use_container_width=True
+    if not st.session_state.raw_df.empty:
+        st.sidebar.success(f"✅ Active: {', '.join(successfully_loaded)}")
+    else:
+        st.sidebar.warning("No data in session state.")
+
+    cache_stats = gold_loader.get_cache_stats()
+    st.sidebar.caption(
+        f"🧠 Memory cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"({cache_stats['close_columns']} Close columns, {cache_stats['entries']} files, {cache_stats['bytes'] / 1e6:.1f} MB)"
+    )
+
+    if successfully_loaded:
+        try:
+            render_friendly = list(set(base_assets + successfully_loaded))
+            current_ticker_map = {
+                a: gold_loader.get_ticker_map()[a]
+                for a in render_friendly
+                if a in gold_loader.get_ticker_map()
+            }
+
+            # Denominators whose series loaded (a failed fetch drops that denominator only)
+            raw_df = st.session_state.raw_df
+            denominators = [
+                d for d in gold_processor.DENOMINATORS
+                if d == "USD" or (ticker_map.get(d) in raw_df.columns and not raw_df[ticker_map[d]].isna().all())
+            ]
+            if denominator not in denominators:
+                st.warning(f"{denominator} data is unavailable in the local cache; showing prices in GOLD.")
+                denominator = "GOLD"
+
+            # Only the selected assets are produced; denominator / FX series feed the
+            # conversion. The result is kept until the inputs change, so changing the
+            # denominator reuses it.
+            inputs_key = (
+                tuple(selected_assets), start_date, end_date, tuple(denominators),
+                tuple(gold_loader.asset_file_version(t) for t in all_tickers),
             )
+            cached = st.session_state.get("denominated")
+            if cached is None or cached[0] != inputs_key:
+                cached = (inputs_key, gold_processor.process_denominated(
+                    raw_df,
+                    current_ticker_map,
+                    gold_loader.CURRENCY_MAPPING,
+                    gold_loader.FX_PAIRS,
+                    assets=selected_assets,
+                    denominators=denominators,
+                ))
+                st.session_state.denominated = cached
+            result = cached[1][denominator]
+            # Names this result for the derived cache without hashing its contents
+            data_version = (inputs_key, denominator)
+
+            def history_index():
+                """WindowIndex of the selected assets in `denominator`, rebuilt only when the assets or files change."""
+                key = (inputs_key[0],) + inputs_key[3:]
+                history = st.session_state.get("history")
+                if history is None or history[0] != key:
+                    history = (key, gold_processor.process_denominated(
+                        gold_loader.get_close_prices(all_tickers, HISTORY_START, datetime.date.today()),
+                        current_ticker_map,
+                        gold_loader.CURRENCY_MAPPING,
+                        gold_loader.FX_PAIRS,
+                        assets=selected_assets,
+                        denominators=denominators,
+                    ), {})
+                    st.session_state.history = history
+                indexes = history[2]
+                if denominator not in indexes:
+                    indexes[denominator] = window_index.WindowIndex(history[1][denominator].normalized)
+                return indexes[denominator]
+
+            if result.assets:
+                final_ts_df = result.normalized
+
+                # Lay out every section up front with placeholders; figures are built on a
+                # thread pool and each one is drawn as soon as it is ready
+                chart_jobs = {}
+
+                performance_header.subheader(f"📈 Performance vs {denominator}")
+                chart_jobs["performance"] = (
+                    performance_slot, charts.plot_normalized_performance, final_ts_df,
+                    {"title": f"Priced in {denominator} (Indexed to 100)", "max_points": max_points, "denominator": denominator},
+                )
 
-    except Exception as e:
-        st.error(f"Error rendering charts: {e}")
-
-st.divider()
-st.caption("Data source: Yahoo Finance. 'Price in Gold' calculated as USD Price of Asset / USD Price of Gold.")
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.subheader("📉 Drawdowns")
+                    chart_jobs["drawdown"] = (st.empty(), charts.plot_drawdown_heatmap, result.drawdown,
+                                              {"max_points": max_points, "denominator": denominator})
+                with col2:
+                    st.subheader("📊 Rolling Correlation (1Y)")
+                    chart_jobs["correlation"] = (st.empty(), charts.plot_correlation_heatmap, result.returns,
+                                                 {"denominator": denominator, "version": data_version})
+
+                # Below the fold: only computed once switched on
+                st.subheader("⚡ Rolling Volatility (30D)")
+                if st.toggle("Show rolling volatility", key="show_rolling_vol"):
+                    chart_jobs["rolling_vol"] = (st.empty(), charts.plot_rolling_vol, result.returns,
+                                                 {"max_points": max_points, "version": data_version})
+
+                st.subheader("📋 Summary Statistics")
+                if st.toggle("Show summary table", key="show_summary"):
+                    st.dataframe(
+                        history_index().metrics(start_date, end_date).style.format("{:.2%}"), use_container_width=True
+                    )
+
+                st.subheader("🗓️ CAGR by Holding Period")
+                if st.toggle("Show CAGR by start / end year", key="show_year_grid"):
+                    grid_asset = st.selectbox("Asset", result.assets, key="year_grid_asset")
+                    chart_jobs["year_grid"] = (
+                        st.empty(), charts.plot_year_grid, history_index().year_grid(grid_asset),
+                        {"title": f"{grid_asset} CAGR in {denominator} by Start / End Year (full history)"},
+                    )
+
+                st.subheader("🧺 Portfolio Backtest")
+                if st.toggle("Show portfolio backtest", key="show_portfolio"):
+                    col1, col2, col3 = st.columns(3)
+                    schedule = col1.selectbox(
+                        "Rebalance", ["monthly", "quarterly", "yearly", "threshold", None],
+                        format_func=lambda s: "never" if s is None else s, key="portfolio_schedule",
+                    )
+                    cost_bps = col2.number_input("Cost (bps of value traded)", 0.0, 500.0, 10.0, step=5.0, key="portfolio_cost")
+                    step = col3.select_slider("Weight step", [0.5, 0.25, 0.2, 0.1, 0.05], value=0.1, key="portfolio_step")
+
+                    # Every allocation on the grid is backtested in one batched pass
+                    n_portfolios = portfolio.grid_size(len(result.assets), step)
+                    if n_portfolios > MAX_PORTFOLIOS:
+                        st.warning(f"{n_portfolios:,} allocations at this step; use a coarser step or fewer assets (limit {MAX_PORTFOLIOS:,}).")
+                    else:
+                        bt = portfolio.backtest(result.returns, portfolio.weight_grid(result.assets, step), schedule, cost_bps / 1e4)
+                        top = bt.best(n=10)
+                        st.caption(f"Best of {n_portfolios:,} allocations by CAGR (priced in {denominator})")
+                        st.dataframe(
+                            top.style.format("{:.2%}", subset=result.assets + ["CAGR", "Volatility", "Max Drawdown", "Turnover"]),
+                            use_container_width=True,
+                        )
+                        nav = bt.nav[top.index[:5]]
+                        nav.columns = [
+                            " / ".join(f"{a} {w:.0%}" for a, w in bt.weights.loc[k].items() if w > 0) for k in nav.columns
+                        ]
+                        chart_jobs["portfolio"] = (
+                            st.empty(), charts.plot_normalized_performance, nav,
+                            {"title": f"Top Allocations in {denominator} (NAV from 100)", "max_points": max_points,
+                             "denominator": denominator},
+                        )
+
+                for name, (slot, _, _, _) in chart_jobs.items():
+                    if name != "performance" or not preview:  # keep the progressive chart until replaced
+                        slot.caption("⏳ Building chart...")
+
+                with concurrent.futures.ThreadPoolExecutor(max_workers=len(chart_jobs)) as pool:
+                    futures = {
+                        pool.submit(profiling.bind(builder), data, **kwargs): name
+                        for name, (_, builder, data, kwargs) in chart_jobs.items()
+                    }
+                    for future in concurrent.futures.as_completed(futures):
+                        name = futures[future]
+                        slot = chart_jobs[name][0]
+                        # One failing chart leaves the others standing
+                        try:
+                            with profiling.span(f"render.{name}"):
+                                slot.plotly_chart(future.result(), use_container_width=True)
+                        except Exception as e:
+                            slot.error(f"Error building the {name.replace('_', ' ')} chart: {e}")
+
+        except Exception as e:
+            st.error(f"Error rendering charts: {e}")
+
+    st.divider()
+    st.caption("Data source: Yahoo Finance. 'Price in Gold' calculated as USD Price of Asset / USD Price of Gold (likewise for Silver and BTC).")
+finally:
+    profiling.finish_run(perf_run)
+
+# --- Timing Panel ---
+st.sidebar.divider()
+if st.sidebar.toggle("⏱️ Show timings", key="show_timings"):
+    st.sidebar.checkbox("Capture cProfile", key="capture_profile", help="Profile the next rerun with cProfile")
+    cache_stats_after = gold_loader.get_cache_stats()
+    st.sidebar.caption(
+        f"This rerun: {perf_run.elapsed():.2f}s, "
+        f"cache {cache_stats_after['hits'] - cache_stats_before['hits']} hits / "
+        f"{cache_stats_after['misses'] - cache_stats_before['misses']} misses"
+    )
+    st.sidebar.dataframe(perf_run.summary().style.format({"wall_s": "{:.3f}", "rows": "{:,.0f}"}), use_container_width=True)
+    if perf_run.profiler is not None:
+        with st.sidebar.expander("cProfile (cumulative)"):
+            st.code(perf_run.profile_text())
+    st.sidebar.caption(f"Spans are appended to `{profiling.SPAN_LOG_PATH}`")
 
@@ -0,0 +1,155 @@
+import os
+import json
+import argparse
+import datetime
+import concurrent.futures
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+import gold_loader
+import gold_processor
+import universe
+
+# Shared Close matrix, attached once per worker process by _attach_shared
+_shared = {}
+
+def parse_universes(specs):
+    """Parses NAME=ASSET,ASSET,... strings into {name: [assets]}."""
+    universes = {}
+    for spec in specs:
+        name, _, assets = spec.partition("=")
+        if not assets:
+            raise ValueError(f"Universe spec must look like NAME=ASSET,ASSET: {spec}")
+        universes[name] = [a.strip() for a in assets.split(",") if a.strip()]
+    return universes
+
+def parse_ranges(specs):
+    """Parses START:END strings into [(start, end)] timestamps."""
+    ranges = []
+    for spec in specs:
+        start, _, end = spec.partition(":")
+        ranges.append((pd.to_datetime(start), pd.to_datetime(end or datetime.date.today())))
+    return ranges
+
+def load_config(path):
+    """
+    Reads a JSON job file:
+    {"universes": {"name": ["SP500", "NIFTY"]}, "ranges": [["2010-01-01", "2020-12-31"]]}
+    """
+    with open(path) as f:
+        config = json.load(f)
+    ranges = [(pd.to_datetime(s), pd.to_datetime(e)) for s, e in config.get("ranges", [])]
+    return config.get("universes", {}), ranges
+
+def _fetch_list(assets):
+    """GOLD + required FX series + the universe's own assets, like the dashboard."""
+    fetch = ["GOLD"]
+    for asset in gold_loader.get_required_fx_assets(assets) + list(assets):
+        if asset not in fetch and asset != "USD":
+            fetch.append(asset)
+    return fetch
+
+def _share_close_matrix(tickers):
+    """Copies the Close block for `tickers` into shared memory once for all workers."""
+    close = universe.Universe.load(tickers, dtype=gold_loader.CLOSE_DTYPE)
+    values, columns = close.fields["Close"], close.tickers
+    dates = close.dates.asi8
+
+    blocks = {}
+    for key, array in (("values", values), ("dates", dates)):
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+        blocks[key] = (shm, array.shape, array.dtype.str)
+    return blocks, columns
+
+def _attach_shared(blocks, columns):
+    """Worker initializer: maps the shared Close matrix without copying it."""
+    for key, (name, shape, dtype) in blocks.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _shared[key + "_shm"] = shm
+        _shared[key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _shared["index"] = pd.DatetimeIndex(_shared["dates"].view("datetime64[ns]"), name="Date")
+    _shared["columns"] = columns
+
+def _run_job(universe, assets, start_dt, end_dt):
+    """Computes gold-denominated metrics for one universe and date range."""
+    ticker_map = gold_loader.get_ticker_map()
+    fetch = _fetch_list(assets)
+    tickers = [ticker_map[a] for a in fetch if a in ticker_map]
+
+    raw = gold_loader.select_close_block(
+        _shared["index"], _shared["values"], _shared["columns"], tickers, start_dt, end_dt
+    ).ffill()
+    if raw.empty or ticker_map["GOLD"] not in raw.columns:
+        return pd.DataFrame()
+
+    render = {a: ticker_map[a] for a in fetch + list(assets) if a in ticker_map}
+    _, metrics_df = gold_processor.process_data(
+        raw, render, gold_loader.CURRENCY_MAPPING, gold_loader.FX_PAIRS
+    )
+    metrics_df = metrics_df.loc[[a for a in assets if a in metrics_df.index]]
+    metrics_df.index.name = "Asset"
+    metrics_df = metrics_df.reset_index()
+    metrics_df.insert(0, "End", end_dt.date())
+    metrics_df.insert(0, "Start", start_dt.date())
+    metrics_df.insert(0, "Universe", universe)
+    return metrics_df
+
+def run_batch(universes, ranges, max_workers=None):
+    """Runs every universe x range job on a process pool; returns one metrics table."""
+    ticker_map = gold_loader.get_ticker_map()
+    needed = []
+    for assets in universes.values():
+        for asset in _fetch_list(assets):
+            ticker = ticker_map.get(asset)
+            if ticker and ticker not in needed:
+                needed.append(ticker)
+
+    blocks, columns = _share_close_matrix(needed)
+    try:
+        init_args = ({k: (shm.name, shape, dtype) for k, (shm, shape, dtype) in blocks.items()}, columns)
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_attach_shared, initargs=init_args
+        ) as pool:
+            futures = [
+                pool.submit(_run_job, name, assets, start_dt, end_dt)
+                for name, assets in universes.items()
+                for start_dt, end_dt in ranges
+            ]
+            tables = [f.result() for f in futures]
+    finally:
+        for shm, _, _ in blocks.values():
+            shm.close()
+            shm.unlink()
+
+    tables = [t for t in tables if not t.empty]
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+def write_report(table, out_path):
+    """Writes the metrics table as Parquet or CSV depending on the file extension."""
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    if out_path.endswith(".parquet"):
+        if not gold_loader.HAS_PARQUET:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow).")
+        table.to_parquet(out_path, index=False)
+    else:
+        table.to_csv(out_path, index=False)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute gold-denominated metrics for many universes without Streamlit.")
+    parser.add_argument("--config", help="JSON file with 'universes' and 'ranges'")
+    parser.add_argument("--universe", action="append", default=[], help="NAME=ASSET,ASSET (repeatable)")
+    parser.add_argument("--range", action="append", default=[], dest="ranges", help="START:END dates (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--out", default="reports/metrics.csv", help="Output file (.csv or .parquet)")
+    args = parser.parse_args()
+
+    universes, ranges = load_config(args.config) if args.config else ({}, [])
+    universes.update(parse_universes(args.universe))
+    ranges += parse_ranges(args.ranges)
+    if not universes or not ranges:
+        parser.error("Provide at least one universe and one date range (via --config or flags).")
+
+    table = run_batch(universes, ranges, max_workers=args.workers)
+    write_report(table, args.out)
+    print(f"✨ Wrote {len(table)} rows for {len(universes)} universes x {len(ranges)} ranges to {args.out}")
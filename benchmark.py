@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import platform
+import datetime
+import subprocess
+import numpy as np
+import pandas as pd
+import gold_loader
+import gold_processor
+import derived_cache
+import charts
+import universe
+
+def generate_assets(n_assets, n_rows, freq, seed=0):
+    """
+    Writes synthetic OHLCV files (geometric random walks) into ASSETS_DIR via
+    save_asset_data. Returns (ticker_map, currency_map) covering GOLD, one FX rate,
+    one asset listed in that currency and n_assets - 3 USD assets.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2000-01-03", periods=n_rows, freq=freq, name="Date")
+
+    ticker_map = {"GOLD": "GC=F", "INR": "INR=X", "NIFTY": "^NSEI"}
+    currency_map = {"GOLD": "USD", "INR": "ExchRate", "NIFTY": "INR"}
+    for i in range(max(n_assets - 3, 0)):
+        name = f"SYN{i:03d}"
+        ticker_map[name] = f"SYN{i:03d}"
+        currency_map[name] = "USD"
+
+    for ticker in ticker_map.values():
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_rows)))
+        spread = np.abs(rng.normal(0, 0.005, n_rows)) * close
+        df = pd.DataFrame(
+            {
+                "Close": close,
+                "High": close + spread,
+                "Low": close - spread,
+                "Open": close + rng.normal(0, 0.002, n_rows) * close,
+                "Volume": rng.integers(0, 1_000_000, n_rows),
+            },
+            index=dates,
+        )
+        gold_loader.save_asset_data(ticker, df)
+    return ticker_map, currency_map
+
+def reset_caches():
+    """Drops every in-process cache so the next call is a cold load."""
+    gold_loader.clear_asset_cache()
+    gold_loader.CLOSE_MATRIX = gold_loader.CloseMatrix()
+    derived_cache._memory.clear()
+    if os.path.exists(derived_cache.DERIVED_DIR):
+        shutil.rmtree(derived_cache.DERIVED_DIR)
+
+def time_call(fn, repeat, setup=None):
+    """Runs fn `repeat` times (calling setup before each) and returns timing stats in seconds."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return {
+        "min": min(samples),
+        "median": float(np.median(samples)),
+        "mean": float(np.mean(samples)),
+        "repeat": repeat,
+    }
+
+def run_benchmarks(n_assets, n_rows, freq, repeat, with_charts=True):
+    """
+    Times the loader, processor and chart hot paths on a synthetic universe.
+    Returns (timings, memory footprints in MB).
+    """
+    results = {}
+    ticker_map, currency_map = generate_assets(n_assets, n_rows, freq)
+    tickers = list(ticker_map.values())
+    start, end = "1990-01-01", "2100-01-01"
+
+    probe = tickers[-1]
+    path = gold_loader.get_asset_path(probe)
+    frame = gold_loader.load_asset_data(probe)
+    tail = frame.iloc[-5:].copy()
+    tail.index = pd.date_range(frame.index[-1], periods=6, freq=freq, name="Date")[1:]
+
+    def restore():
+        # Rewritten through save_asset_data so the catalog entry and the CSV offset
+        # sidecar are current, and the timed append extends them in O(new rows)
+        os.remove(path)
+        gold_loader.save_asset_data(probe, frame)
+
+    results["save_asset_data.full"] = time_call(
+        lambda: gold_loader.save_asset_data(probe, frame), repeat, setup=lambda: os.remove(path)
+    )
+    results["save_asset_data.append"] = time_call(
+        lambda: gold_loader.save_asset_data(probe, tail), repeat, setup=restore
+    )
+    restore()
+
+    results["load_asset_data.cold_all"] = time_call(
+        lambda: [gold_loader.load_asset_data(t) for t in tickers], repeat, setup=reset_caches
+    )
+    results["load_asset_data.warm_all"] = time_call(
+        lambda: [gold_loader.load_asset_data(t) for t in tickers], repeat
+    )
+    results["get_close_prices.cold"] = time_call(
+        lambda: gold_loader.get_close_prices(tickers, start, end), repeat, setup=reset_caches
+    )
+    results["get_close_prices.warm"] = time_call(
+        lambda: gold_loader.get_close_prices(tickers, start, end), repeat
+    )
+
+    results["universe.load_close"] = time_call(lambda: universe.Universe.load(tickers), repeat)
+
+    raw = gold_loader.get_close_prices(tickers, start, end)
+    results["process_data"] = time_call(
+        lambda: gold_processor.process_data(raw, ticker_map, currency_map), repeat
+    )
+    result = gold_processor.process_prices(raw, ticker_map, currency_map)
+    normalized_df = result.normalized
+    results["calculate_metrics.all_columns"] = time_call(
+        lambda: [gold_processor.calculate_metrics(normalized_df[c]) for c in normalized_df.columns], repeat
+    )
+
+    if with_charts:
+        builders = {
+            "plot_normalized_performance": (charts.plot_normalized_performance, normalized_df),
+            "plot_drawdown_heatmap": (charts.plot_drawdown_heatmap, result.drawdown),
+            "plot_correlation_heatmap": (charts.plot_correlation_heatmap, result.returns),
+            "plot_rolling_vol": (charts.plot_rolling_vol, result.returns),
+        }
+        for name, (builder, data) in builders.items():
+            results[f"charts.{name}.cold"] = time_call(
+                lambda: builder(data).to_json(), repeat, setup=reset_caches
+            )
+            results[f"charts.{name}.warm"] = time_call(lambda: builder(data).to_json(), repeat)
+    return results, measure_memory(tickers)
+
+def measure_memory(tickers):
+    """MB held by per-asset OHLCV DataFrames versus Universe containers for the same assets."""
+    frames = {t: gold_loader.load_asset_data(t) for t in tickers}
+    mb = lambda n: n / 1e6
+    return {
+        "frames_ohlcv": mb(sum(int(df.memory_usage(index=True).sum()) for df in frames.values())),
+        "universe_ohlcv_float64": mb(universe.Universe.from_frames(frames, universe.FIELDS).nbytes),
+        "universe_ohlcv_float32": mb(universe.Universe.from_frames(frames, universe.FIELDS, "float32").nbytes),
+        "universe_close_float32": mb(universe.Universe.from_frames(frames, ("Close",), "float32").nbytes),
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+# Run settings a baseline must share for its timings to be comparable
+COMPARABLE_META = ("assets", "rows", "freq", "storage", "repeat", "charts")
+
+def meta_differences(current, baseline):
+    """{setting: (baseline, current)} for every comparable setting the two reports disagree on."""
+    return {
+        key: (baseline["meta"].get(key), current["meta"].get(key))
+        for key in COMPARABLE_META
+        if baseline["meta"].get(key) != current["meta"].get(key)
+    }
+
+def compare(current, baseline, threshold):
+    """Prints median ratios against a baseline report; returns the names that regressed."""
+    regressions = []
+    print(f"{'benchmark':45s} {'baseline':>10s} {'current':>10s} {'ratio':>7s}")
+    for name, stats in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base:
+            print(f"{name:45s} {'-':>10s} {stats['median']:10.4f}")
+            continue
+        ratio = stats["median"] / base["median"] if base["median"] else float("inf")
+        flag = " ❌" if ratio > threshold else ""
+        print(f"{name:45s} {base['median']:10.4f} {stats['median']:10.4f} {ratio:7.2f}{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark loader, processor and chart hot paths on synthetic data.")
+    parser.add_argument("--assets", type=int, default=13, help="Number of synthetic assets")
+    parser.add_argument("--rows", type=int, default=6500, help="Bars per asset")
+    parser.add_argument("--freq", default="D", help="Bar spacing as a pandas frequency (D, h, 5min, min)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark")
+    parser.add_argument("--storage", choices=sorted(gold_loader.STORAGE_EXTENSIONS), default=gold_loader.STORAGE_FORMAT)
+    parser.add_argument("--skip-charts", action="store_true", help="Skip the Plotly figure builders")
+    parser.add_argument("--out", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Median slowdown ratio counted as a regression")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="gdwa-bench-")
+    gold_loader.ASSETS_DIR = os.path.join(workdir, "assets/")
+    gold_loader.STORAGE_FORMAT = args.storage
+    derived_cache.DERIVED_DIR = os.path.join(workdir, "derived/")
+    try:
+        results, memory = run_benchmarks(args.assets, args.rows, args.freq, args.repeat, with_charts=not args.skip_charts)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "assets": args.assets,
+            "rows": args.rows,
+            "freq": args.freq,
+            "storage": args.storage,
+            "repeat": args.repeat,
+            "charts": not args.skip_charts,
+            "revision": git_revision(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+        },
+        "results": results,
+        "memory_mb": memory,
+    }
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        differences = meta_differences(report, baseline)
+        if differences:
+            for key, (base_value, value) in differences.items():
+                print(f"Baseline {key} = {base_value!r}, this run {key} = {value!r}")
+            print(f"Not comparing with {args.compare}: rerun with the baseline's settings.")
+            sys.exit(2)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions (> {args.threshold:.2f}x): {', '.join(regressions)}")
+            sys.exit(1)
+    else:
+        for name, stats in results.items():
+            print(f"{name:45s} median {stats['median'] * 1000:9.2f} ms")
+        for name, mb in memory.items():
+            print(f"memory.{name:38s} {mb:9.2f} MB")
@@ -1,22 +1,93 @@
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
+import derived_cache
+import profiling
 
-def plot_normalized_performance(df, title="Gold-Denominated Performance (Indexed to 100)"):
+# Points per trace sent to the browser, roughly the pixel width of a wide chart.
+# Narrowing the sidebar date range re-resolves the charts at up to full daily detail.
+MAX_POINTS = 1500
+
+def minmax_indices(y, max_points):
+    """
+    Positions to keep when reducing `y` to about `max_points`: the min and the max
+    of each bucket (in time order) plus both endpoints, so no peak or trough is lost.
+    """
+    n = len(y)
+    if not max_points or n <= max_points:
+        return np.arange(n)
+    n_buckets = max(max_points // 2, 1)
+    bucket = np.arange(n) * n_buckets // n
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+
+    keep = [np.array([0, n - 1])]
+    for reduce in (np.minimum, np.maximum):
+        extreme = reduce.reduceat(y, starts)
+        candidates = np.flatnonzero(y == extreme[bucket])
+        # First position reaching the extreme within each bucket
+        _, first = np.unique(bucket[candidates], return_index=True)
+        keep.append(candidates[first])
+    return np.unique(np.concatenate(keep))
+
+def downsample_traces(df, max_points=MAX_POINTS):
+    """
+    Reduces each column independently with min/max bucketing.
+    Returns long-form data (date, Asset, value) ready for px.line(color="Asset").
+    """
+    date_col = df.index.name or "Date"
+    parts = []
+    for col in df.columns:
+        s = df[col].dropna()
+        s = s.iloc[minmax_indices(s.to_numpy(dtype="float64"), max_points)]
+        parts.append(pd.DataFrame({date_col: s.index, "Asset": col, "value": s.to_numpy()}))
+    if not parts:
+        return pd.DataFrame(columns=[date_col, "Asset", "value"])
+    return pd.concat(parts, ignore_index=True)
+
+def downsample_minmax(df, max_points=MAX_POINTS):
     """
-    Line chart for normalized asset values.
+    Min/max bucketing on a shared time axis: each bucket contributes its per-column
+    max at the bucket start and min at the bucket midpoint, so every peak and trough
+    survives while traces stay aligned (needed for stacked area charts).
     """
-    fig = px.line(df, title=title)
+    n = len(df)
+    if not max_points or n <= max_points:
+        return df
+    n_buckets = max_points // 2
+    bucket = np.arange(n) * n_buckets // n
+    values = df.to_numpy(dtype="float64")
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    mids = (starts + np.r_[starts[1:], n]) // 2
+    with np.errstate(invalid="ignore"):
+        highs = np.fmax.reduceat(values, starts, axis=0)
+        lows = np.fmin.reduceat(values, starts, axis=0)
+    out = np.empty((2 * len(starts), values.shape[1]))
+    out[0::2], out[1::2] = highs, lows
+    index = np.empty(2 * len(starts), dtype=df.index.dtype)
+    index[0::2], index[1::2] = df.index[starts], df.index[mids]
+    return pd.DataFrame(out, index=pd.Index(index, name=df.index.name), columns=df.columns)
+
+@profiling.timed("charts.plot_normalized_performance", input_rows=True)
+def plot_normalized_performance(df, title=None, max_points=MAX_POINTS, denominator="Gold"):
+    """
+    Line chart for normalized asset values, priced in `denominator`.
+    Each trace is reduced to about `max_points` with min/max bucketing (None for full detail).
+    """
+    long_df = downsample_traces(df, max_points)
+    title = title or f"{denominator}-Denominated Performance (Indexed to 100)"
+    fig = px.line(long_df, x=long_df.columns[0], y="value", color="Asset", title=title)
     fig.update_layout(
         xaxis_title="Date",
-        yaxis_title="Value (Base 100 in Gold)",
+        yaxis_title=f"Value (Base 100 in {denominator})",
         legend_title="Asset",
         hovermode="x unified",
         template="plotly_dark"
     )
     return fig
 
-def plot_drawdown_heatmap(df):
+@profiling.timed("charts.plot_drawdown_heatmap", input_rows=True)
+def plot_drawdown_heatmap(drawdown, max_points=MAX_POINTS, denominator="Gold"):
     """
     Shows drawdowns. Since we want 'small multiples' or togglable, 
     but for a summary view, a line chart of drawdowns is often clearer than heatmap 
@@ -24,13 +95,14 @@ def plot_drawdown_heatmap(df):
     
     We can do a Facet plot or just overlaid lines for now (easier to read interactively).
     Let's try overlaid lines first, but if too messy, we can refactor.
+
+    Takes the drawdown already computed by the processor (ProcessedData.drawdown).
     """
-    # Calculate drawdown — drop NaN to avoid cummax issues with different start dates
-    clean_df = df.dropna(how='all')
-    rolling_max = clean_df.cummax()
-    drawdown = (clean_df - rolling_max) / rolling_max
+    # Skip rows before any asset starts
+    drawdown = drawdown.dropna(how='all')
     
-    fig = px.area(drawdown, title="Underwater Drawdown vs Gold")
+    # Min/max bucketing keeps every drawdown trough in the reduced series
+    fig = px.area(downsample_minmax(drawdown, max_points), title=f"Underwater Drawdown vs {denominator}")
     fig.update_layout(
          xaxis_title="Date",
          yaxis_title="Drawdown %",
@@ -39,38 +111,97 @@ def plot_drawdown_heatmap(df):
     )
     return fig
 
-def plot_correlation_heatmap(df, window_days=365):
+# Slider positions in the rolling correlation heatmap
+MAX_CORRELATION_FRAMES = 60
+
+def _correlation_heatmap_trace(matrix, assets):
+    return go.Heatmap(
+        z=matrix, x=assets, y=assets,
+        colorscale="RdBu", zmin=-1, zmax=1,
+        texttemplate="%{z:.2f}",
+    )
+
+@profiling.timed("charts.plot_correlation_heatmap", input_rows=True)
+def plot_correlation_heatmap(returns, window_days=365, denominator="Gold", version=None):
     """
-    Correlation of Gold-Denominated Returns.
+    Rolling 1-year correlation heatmap of returns priced in `denominator`
+    (ProcessedData.returns; gaps are skipped pair by pair). `version` identifies the
+    data for the derived cache (see derived_cache._cache_key).
+    The slider steps through the correlation matrix of each trailing window (ending
+    on the latest date by default). Falls back to a single matrix over the whole
+    range when there is less than one window of data.
     """
-    returns = df.pct_change(fill_method=None).dropna()
-    # Rolling correlation is complex to visualize for *all pairs* over time.
-    # Usually a static heatmap of the *current* or *average* correlation over the selected period is best.
-    # The requirement says 'Rolling 1-year correlation Heatmap'. 
-    # This might mean a heatmap of the *latest* rolling window, OR a time series of correlations.
-    # A time series of correlations for N assets is N*(N-1)/2 lines (messy).
-    # Let's provide a Heatmap of the correlation over the ENTIRE selected range.
-    
-    corr_matrix = returns.corr()
-    
-    fig = px.imshow(corr_matrix, 
-                    text_auto=True, 
-                    title=f"Correlation Matrix (Daily Returns, Gold Denominated)",
-                    color_continuous_scale="RdBu",
-                    zmin=-1, zmax=1)
-    fig.update_layout(template="plotly_dark")
+    assets = list(returns.columns)
+    span_days = (returns.index[-1] - returns.index[0]).days if len(returns) > 1 else 0
+    # Observations per window, whatever the calendar (daily, trading days, weekends)
+    window = int(round(len(returns) * window_days / span_days)) if span_days else 0
+
+    if window < 2 or len(returns) < window:
+        corr_matrix = derived_cache.correlation(returns, version)
+        fig = px.imshow(corr_matrix, 
+                        text_auto=True, 
+                        title=f"Correlation Matrix (Daily Returns, {denominator} Denominated)",
+                        color_continuous_scale="RdBu",
+                        zmin=-1, zmax=1)
+        fig.update_layout(template="plotly_dark")
+        return fig
+
+    dates, cube = derived_cache.rolling_correlation(returns, window, version)
+    positions = np.unique(np.linspace(window - 1, len(dates) - 1, MAX_CORRELATION_FRAMES).astype(int))
+    labels = [dates[p].strftime("%Y-%m-%d") for p in positions]
+
+    fig = go.Figure(
+        data=[_correlation_heatmap_trace(cube[positions[-1]], assets)],
+        frames=[
+            go.Frame(data=[_correlation_heatmap_trace(cube[p], assets)], name=label)
+            for p, label in zip(positions, labels)
+        ],
+    )
+    fig.update_layout(
+        title=f"Rolling {window_days}-Day Correlation (Daily Returns, {denominator} Denominated)",
+        template="plotly_dark",
+        yaxis=dict(autorange="reversed"),
+        sliders=[dict(
+            active=len(positions) - 1,
+            currentvalue=dict(prefix="Window ending: "),
+            steps=[
+                dict(label=label, method="animate",
+                     args=[[label], dict(mode="immediate", frame=dict(duration=0, redraw=True))])
+                for label in labels
+            ],
+        )],
+        updatemenus=[dict(
+            type="buttons", showactive=False, x=0, y=-0.15, xanchor="left",
+            buttons=[dict(label="▶ Play", method="animate",
+                          args=[None, dict(frame=dict(duration=300, redraw=True), fromcurrent=True)])],
+        )],
+    )
     return fig
 
-def plot_rolling_vol(df, window=30):
+@profiling.timed("charts.plot_rolling_vol", input_rows=True)
+def plot_rolling_vol(returns, window=30, max_points=MAX_POINTS, version=None):
     """
-    Rolling annualized volatility.
+    Rolling annualized volatility of simple returns (ProcessedData.returns).
+    `version` identifies the data for the derived cache.
     """
-    returns = df.pct_change(fill_method=None).dropna()
-    rolling_vol = returns.rolling(window=window).std() * (252**0.5)
+    rolling_vol = derived_cache.rolling_vol(returns, window, version)
     
-    fig = px.line(rolling_vol, title=f"Rolling {window}-Day Annualized Volatility")
+    long_df = downsample_traces(rolling_vol, max_points)
+    fig = px.line(long_df, x=long_df.columns[0], y="value", color="Asset",
+                  title=f"Rolling {window}-Day Annualized Volatility")
     fig.update_layout(
         yaxis_title="Annualized Volatility",
         template="plotly_dark"
     )
     return fig
+
+@profiling.timed("charts.plot_year_grid", input_rows=True)
+def plot_year_grid(grid, title="CAGR by Start / End Year"):
+    """
+    Heatmap of a metric for every holding period (rows: start year, columns: end
+    year, as built by WindowIndex.year_grid).
+    """
+    fig = px.imshow(grid, text_auto=".0%", aspect="auto", title=title,
+                    color_continuous_scale="RdYlGn", color_continuous_midpoint=0)
+    fig.update_layout(template="plotly_dark")
+    return fig
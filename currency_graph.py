@@ -0,0 +1,107 @@
+from collections import deque
+
+# Currency every asset is converted to before being priced in gold
+ANCHOR = "USD"
+
+class CurrencyGraph:
+    """
+    Currencies as nodes, FX series as edges.
+
+    `fx_pairs` maps an FX asset name to its (base, quote) pair; the series quotes
+    units of `quote` per one `base` (e.g. "INR": ("USD", "INR") for INR=X). Any
+    currency connected to USD through a chain of pairs can be converted, and each
+    conversion path is resolved once and cached.
+
+    A path is a tuple of (fx_asset, exponent) terms:
+    Price_USD = Price_native * prod(rate[fx_asset] ** exponent).
+    """
+
+    def __init__(self, fx_pairs, anchor=ANCHOR):
+        self.anchor = anchor
+        self.fx_pairs = dict(fx_pairs)
+        self._edges = {}
+        for fx_asset, (base, quote) in self.fx_pairs.items():
+            # quote -> base: divide by the rate; base -> quote: multiply by it
+            self._edges.setdefault(quote, []).append((base, fx_asset, -1))
+            self._edges.setdefault(base, []).append((quote, fx_asset, 1))
+        self._paths = {anchor: ()}
+
+    def path_to_usd(self, currency):
+        """Returns the cached (fx_asset, exponent) terms converting `currency` to USD."""
+        if currency in self._paths:
+            return self._paths[currency]
+
+        # Breadth-first search from the anchor gives the path with the fewest FX hops
+        paths = {self.anchor: ()}
+        queue = deque([self.anchor])
+        while queue:
+            node = queue.popleft()
+            for neighbour, fx_asset, exponent in self._edges.get(node, []):
+                if neighbour in paths:
+                    continue
+                # Walking anchor -> neighbour; the neighbour -> anchor conversion uses the
+                # same edge in the opposite direction (flipped exponent)
+                paths[neighbour] = ((fx_asset, -exponent),) + paths[node]
+                queue.append(neighbour)
+
+        if currency not in paths:
+            raise ValueError(f"No FX path from {currency} to {self.anchor}.")
+        self._paths[currency] = paths[currency]
+        return paths[currency]
+
+    def fx_currency(self, fx_asset):
+        """The currency an FX asset represents when plotted on its own (the non-USD leg)."""
+        base, quote = self.fx_pairs[fx_asset]
+        return quote if base == self.anchor else base
+
+    def conversion(self, asset_name, asset_type):
+        """
+        Returns (uses_own_price, terms) for converting an asset to USD, or None for
+        the synthetic US Dollar. `asset_type` is the asset's CURRENCY_MAPPING entry.
+        """
+        if asset_type == "USD_CURRENCY":
+            return None
+        if asset_type == "ExchRate":
+            if asset_name in self.fx_pairs:
+                # The FX series itself: value of one unit of its currency in USD
+                return False, self.path_to_usd(self.fx_currency(asset_name))
+            # Legacy: an unlisted USD/<ccy> rate, Price_USD = 1 / Rate
+            return False, ((asset_name, -1),)
+        return True, self.path_to_usd(asset_type)
+
+    def required_fx_assets(self, assets, currency_map):
+        """FX assets whose series must be fetched to convert `assets` to USD."""
+        required = []
+        for asset_name in assets:
+            asset_type = currency_map.get(asset_name)
+            if asset_type is None:
+                continue
+            conversion = self.conversion(asset_name, asset_type)
+            if conversion is None:
+                continue
+            for fx_asset, _ in conversion[1]:
+                if fx_asset not in required:
+                    required.append(fx_asset)
+        return required
+
+_graphs = {}
+
+def get_graph(fx_pairs):
+    """Returns a shared CurrencyGraph for `fx_pairs`, so cached paths outlive each call."""
+    key = tuple(sorted(fx_pairs.items()))
+    if key not in _graphs:
+        _graphs[key] = CurrencyGraph(fx_pairs)
+    return _graphs[key]
+
+def implied_usd_pairs(ticker_map, currency_map):
+    """
+    FX pairs implied by a currency_map that has no explicit FX config: every
+    currency code or ExchRate asset that is also an asset name is read as USD/<code>.
+    """
+    pairs = {}
+    for asset_name, asset_type in currency_map.items():
+        if asset_type == "ExchRate":
+            pairs[asset_name] = (ANCHOR, asset_name)
+        elif asset_type != ANCHOR and (asset_type in ticker_map or asset_type in currency_map):
+            pairs.setdefault(asset_type, (ANCHOR, asset_type))
+    return pairs
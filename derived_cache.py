@@ -0,0 +1,135 @@
+import os
+import hashlib
+import threading
+import pandas as pd
+import gold_processor
+from collections import OrderedDict
+
+# Derived series (returns, rolling stats) are stored next to the asset store
+DERIVED_DIR = "data/derived/"
+
+# Entries kept in memory before the least recently used are dropped
+MEMORY_ENTRIES = 32
+
+# Total size of the on-disk entries before the least recently used are deleted
+# (rolling correlation cubes grow with assets^2 x dates, so a count is no bound)
+DISK_MAX_BYTES = 512 * 1024**2
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+def fingerprint(df):
+    """
+    Content hash of a frame, for callers that cannot name the data's version.
+    Because the key then hashes the data itself, any change to an underlying asset
+    file changes the key, and stale entries are never served.
+    """
+    h = hashlib.sha1()
+    h.update(repr(list(df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _cache_key(kind, df, params, version=None):
+    """
+    Key built from the asset set, date range, window parameters and the data's
+    `version`: anything that changes whenever the data does (e.g. the input files'
+    (path, mtime, size) plus the denominator). Without one, the data is hashed.
+    """
+    span = (str(df.index[0]), str(df.index[-1])) if len(df) else ("", "")
+    raw = repr((kind, tuple(df.columns), span, sorted(params.items()), fingerprint(df) if version is None else version))
+    return f"{kind}-{hashlib.sha1(raw.encode()).hexdigest()[:20]}"
+
+def _prune_disk():
+    """Deletes the least recently used entries until the disk layer fits DISK_MAX_BYTES."""
+    files = []
+    for f in os.listdir(DERIVED_DIR):
+        if f.endswith(".pkl"):
+            try:
+                stat = os.stat(os.path.join(DERIVED_DIR, f))
+            except OSError:
+                continue  # removed by another thread meanwhile
+            files.append((stat.st_mtime, stat.st_size, os.path.join(DERIVED_DIR, f)))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= DISK_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+def get_or_compute(kind, df, compute, version=None, **params):
+    """
+    Returns the cached result of compute() for (kind, df, params), computing it on a
+    miss. See _cache_key for `version`.
+    """
+    key = _cache_key(kind, df, params, version)
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            _stats["hits"] += 1
+            return _memory[key]
+
+    path = os.path.join(DERIVED_DIR, f"{key}.pkl")
+    result = None
+    if os.path.exists(path):
+        try:
+            result = pd.read_pickle(path)
+            os.utime(path)
+            with _lock:
+                _stats["disk_hits"] += 1
+        except Exception as e:
+            print(f"Error reading derived cache {path}: {e}")
+
+    if result is None:
+        with _lock:
+            _stats["misses"] += 1
+        result = compute()
+        try:
+            os.makedirs(DERIVED_DIR, exist_ok=True)
+            # Unique per writer: concurrent chart threads may compute the same entry
+            tmp_path = path + f".{os.getpid()}.{threading.get_ident()}.tmp"
+            pd.to_pickle(result, tmp_path)
+            if os.path.getsize(tmp_path) > DISK_MAX_BYTES:
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+                _prune_disk()
+        except Exception as e:
+            print(f"Error writing derived cache {path}: {e}")
+
+    with _lock:
+        _memory[key] = result
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+    return result
+
+def get_stats():
+    """Hit counters for the memory and disk layers."""
+    with _lock:
+        return dict(_stats)
+
+def rolling_vol(returns, window=30, version=None):
+    """Rolling annualized volatility of simple returns over `window` observations."""
+    return get_or_compute(
+        "rolling_vol", returns, lambda: returns.rolling(window=window).std() * (252**0.5),
+        version=version, window=window,
+    )
+
+def correlation(returns, version=None):
+    """Correlation matrix of simple returns (pairwise complete) over the whole frame."""
+    return get_or_compute("correlation", returns, returns.corr, version=version)
+
+def rolling_correlation(returns, window, version=None):
+    """
+    Rolling pairwise correlation of simple returns over `window` observations.
+    Returns (dates, cube) where cube[t] is the asset x asset matrix ending at dates[t].
+    """
+    return get_or_compute(
+        "rolling_correlation", returns,
+        lambda: (returns.index, gold_processor.rolling_correlation_cube(returns.to_numpy(), window)),
+        version=version, window=window,
+    )
@@ -1,12 +1,37 @@
 import yfinance as yf
 import pandas as pd
+import numpy as np
 import streamlit as st
+import currency_graph
+import profiling
 import os
+import io
+import json
+import zlib
 import time
 import random
+import re
 import datetime
+import shutil
+import tempfile
+import threading
+import contextlib
+import concurrent.futures
+from collections import OrderedDict
 
-# Delay (in seconds) between consecutive Yahoo Finance API calls to avoid rate limits
+try:
+    import pyarrow.parquet as pq  # optional, enables the Parquet storage backend
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+try:
+    import fcntl  # POSIX only, enables cross-process write locks on asset files
+except ImportError:
+    fcntl = None
+
+# Initial delay (in seconds) between Yahoo Finance API calls; the shared RateLimiter
+# adapts the actual pace from there
 FETCH_DELAY = 2.0
 
 # Mapping of asset keys to Yahoo Finance Tickers
@@ -54,29 +79,670 @@ CURRENCY_MAPPING = {
     "ETH": "USD",
 }
 
+# FX series as currency pairs: asset key -> (base, quote), quoted as units of `quote`
+# per one `base` (INR=X is INR per USD; a EURUSD=X entry would be ("EUR", "USD")).
+# Assets listed in any currency reachable from USD through these pairs are converted
+# automatically, e.g. adding a EUR-listed index only needs an ASSET_TICKERS entry,
+# a CURRENCY_MAPPING entry of "EUR" and a "EUR": ("EUR", "USD") pair here.
+FX_PAIRS = {
+    "INR": ("USD", "INR"),
+    "JPY": ("USD", "JPY"),
+    "CNY": ("USD", "CNY"),
+}
+
 ASSETS_DIR = "data/assets/"
 
-def get_asset_path(ticker):
-    """Returns the filesystem path for a given ticker's OHLCV data."""
+# On-disk format for asset files: "csv" (portable, default) or "parquet" (columnar,
+# no date parsing on load). Switch with GDWA_STORAGE_FORMAT=parquet after running
+# `python sync_data.py --migrate`.
+STORAGE_FORMAT = os.environ.get("GDWA_STORAGE_FORMAT", "csv").lower()
+if STORAGE_FORMAT == "parquet" and not HAS_PARQUET:
+    print("pyarrow is not installed; falling back to CSV asset storage.")
+    STORAGE_FORMAT = "csv"
+
+STORAGE_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet"}
+
+# Bar intervals. Daily bars live in one file per asset; intraday bars are partitioned
+# under data/assets/intraday/<interval>/<asset>/ into one file per month ("M") or
+# year ("Y"), so loading a window only reads the partitions it touches.
+# lookback_days / request_days are Yahoo's limits on how far back an interval is
+# served and how much one request may span. asof_tolerance is how stale a gold or
+# FX quote may be when an asset bar is denominated against it (see process_data).
+DAILY_INTERVAL = "1d"
+INTERVALS = {
+    "1m": {"step": "1min", "partition": "M", "lookback_days": 30, "request_days": 7, "asof_tolerance": "15min"},
+    "5m": {"step": "5min", "partition": "M", "lookback_days": 60, "request_days": 30, "asof_tolerance": "30min"},
+    "15m": {"step": "15min", "partition": "M", "lookback_days": 60, "request_days": 30, "asof_tolerance": "1h"},
+    "30m": {"step": "30min", "partition": "M", "lookback_days": 60, "request_days": 30, "asof_tolerance": "2h"},
+    "1h": {"step": "1h", "partition": "Y", "lookback_days": 730, "request_days": 180, "asof_tolerance": "4h"},
+}
+# Partition file names (without extension) for each partition frequency
+PARTITION_NAMES = {"M": re.compile(r"\d{4}-\d{2}"), "Y": re.compile(r"\d{4}")}
+
+# Date-window reads (read_asset_window) seek instead of loading whole files: CSV files
+# get a sidecar (<file>.idx) mapping every CSV_INDEX_STRIDE-th row's date to its byte
+# offset, and Parquet files are written in row groups of PARQUET_ROW_GROUP_ROWS rows
+# (about a year of daily bars) whose min/max statistics let the reader skip them.
+CSV_INDEX_STRIDE = 64
+PARQUET_ROW_GROUP_ROWS = 256
+
+# Element type of the in-memory Close matrix. "float32" halves its footprint for large
+# universes; prices keep ~7 significant digits and processing still runs in float64.
+CLOSE_DTYPE = os.environ.get("GDWA_CLOSE_DTYPE", "float64")
+
+# Manifest of what is stored (see load_catalog), kept in ASSETS_DIR
+CATALOG_FILE = "catalog.json"
+
+# Asset files read in parallel when the Close matrix loads several tickers at once
+LOAD_WORKERS = 8
+
+# Upper bound on memory held by the in-process asset cache (see load_asset_data)
+ASSET_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Process-wide LRU cache of loaded asset frames: path -> (mtime_ns, size, nbytes, df).
+# Module state survives Streamlit reruns, so repeat renders skip disk I/O entirely.
+_asset_cache = OrderedDict()
+_asset_cache_lock = threading.Lock()
+_asset_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+def _clean_name(ticker):
     # Clean ticker name for filename (remove ^ or = characters)
-    clean_name = ticker.replace("^", "").replace("=", "").replace("/", "_")
-    return os.path.join(ASSETS_DIR, f"{clean_name}.csv")
+    return ticker.replace("^", "").replace("=", "").replace("/", "_")
 
-def retry_yf_download(tickers, start, end, max_retries=3):
+def get_asset_path(ticker, fmt=None):
+    """Returns the filesystem path for a given ticker's OHLCV data."""
+    ext = STORAGE_EXTENSIONS[fmt or STORAGE_FORMAT]
+    return os.path.join(ASSETS_DIR, f"{_clean_name(ticker)}{ext}")
+
+def get_partition_dir(ticker, interval):
+    """Directory holding a ticker's intraday partitions for one interval."""
+    return os.path.join(ASSETS_DIR, "intraday", interval, _clean_name(ticker))
+
+def _partition_files(ticker, interval):
+    """
+    Yields (period, extension, path) for each partition file of a ticker. Files
+    whose names don't match the interval's partition pattern (leftover temp files,
+    notes, ...) are skipped.
+    """
+    folder = get_partition_dir(ticker, interval)
+    if not os.path.isdir(folder):
+        return
+    freq = INTERVALS[interval]["partition"]
+    for f in sorted(os.listdir(folder)):
+        key, ext = os.path.splitext(f)
+        if ext not in STORAGE_EXTENSIONS.values() or not PARTITION_NAMES[freq].fullmatch(key):
+            continue
+        yield pd.Period(key, freq=freq), ext, os.path.join(folder, f)
+
+def _list_partitions(ticker, interval):
+    """
+    Returns {period: path} for a ticker's intraday partitions, sorted by period.
+    When a partition exists in both formats the configured one wins.
+    """
+    found = {}
+    for period, ext, path in _partition_files(ticker, interval):
+        if ext == ".parquet" and not HAS_PARQUET:
+            continue
+        if period not in found or ext == STORAGE_EXTENSIONS[STORAGE_FORMAT]:
+            found[period] = path
+    return dict(sorted(found.items()))
+
+def _read_asset_file(path):
+    """Reads an asset file in whichever format its extension indicates."""
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, index_col=0, parse_dates=True)
+
+# Read once: mkstemp files are private, temp files get the mode open() would give
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _temp_path(path):
+    """
+    A new, uniquely named file next to `path` (same directory, so renaming it onto
+    `path` is atomic). Concurrent writers never share one.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    os.chmod(tmp_path, 0o666 & ~_UMASK)
+    return tmp_path
+
+def _replace(tmp_path, path):
+    """Renames a written, fsynced temp file onto `path`, then fsyncs the directory so the rename survives a crash."""
+    os.replace(tmp_path, path)
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def _write_asset_file(df, path):
+    """
+    Writes an asset file in whichever format its extension indicates.
+    The data goes to a temp file first and is renamed into place, so readers
+    never see a half-written file.
+    """
+    tmp_path = _temp_path(path)
+    try:
+        if path.endswith(".parquet"):
+            df.to_parquet(tmp_path, row_group_size=PARQUET_ROW_GROUP_ROWS)
+        else:
+            df.to_csv(tmp_path)
+        with open(tmp_path, "rb+") as f:
+            os.fsync(f.fileno())
+        _replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+@contextlib.contextmanager
+def _write_lock(path, blocking=True):
+    """
+    Exclusive advisory lock on an asset file (held on <file>.lock), taken by writers
+    for a whole merge so readers in other threads or processes (e.g. the dashboard
+    while sync_daemon appends) can tell an append in progress from a crashed one.
+    Non-blocking, yields whether the lock was acquired. Without fcntl (Windows)
+    writers proceed unlocked and non-blocking callers are never granted the lock.
+    """
+    if fcntl is None:
+        yield blocking
+        return
+    with open(path + ".lock", "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _recover_journal(path, locked=False):
+    """
+    Rolls back an append to `path` that was interrupted before it completed.
+    A journal only means a crash if no writer holds the file's lock, so readers
+    leave it alone while one does; writers pass `locked` as they hold it already.
+    """
+    journal_path = path + ".journal"
+    if not os.path.exists(journal_path):
+        return
+    if not locked:
+        with _write_lock(path, blocking=False) as acquired:
+            if acquired:
+                _recover_journal(path, locked=True)
+        return
+    if not os.path.exists(journal_path):
+        return
+    try:
+        with open(journal_path) as f:
+            original_size = int(f.read().strip())
+        with open(path, "rb+") as f:
+            f.truncate(original_size)
+        print(f"Rolled back interrupted write to {path}")
+    except (OSError, ValueError) as e:
+        print(f"Error recovering {path} from journal: {e}")
+    os.remove(journal_path)
+
+def _read_csv_bounds(path):
+    """
+    Returns (columns, first_date, last_date) of a CSV asset file by reading only
+    its header, first row and last row. Returns None if the file has no rows.
+    """
+    with open(path, "rb") as f:
+        header = f.readline().decode().strip()
+        first_line = f.readline().decode().strip()
+        if not first_line:
+            return None
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 4096))
+        last_line = f.read().decode().strip().splitlines()[-1]
+    columns = header.split(",")[1:]
+    first_date = pd.to_datetime(first_line.split(",")[0])
+    last_date = pd.to_datetime(last_line.split(",")[0])
+    return columns, first_date, last_date
+
+def _append_csv_rows(path, df):
+    """
+    Appends rows to an existing CSV asset file. The original size is journaled
+    first so a crash mid-write can be rolled back by _recover_journal.
+    Callers hold the file's _write_lock.
+    """
+    journal_path = path + ".journal"
+    original_stat = os.stat(path)
+    original_size = original_stat.st_size
+    with open(journal_path, "w") as f:
+        f.write(str(original_size))
+        f.flush()
+        os.fsync(f.fileno())
+
+    with open(path, "rb") as f:
+        f.seek(max(0, original_size - 1))
+        needs_newline = original_size > 0 and f.read(1) != b"\n"
+
+    with open(path, "a", newline="") as f:
+        if needs_newline:
+            f.write("\n")
+        df.to_csv(f, header=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.remove(journal_path)
+    _extend_csv_offset_index(path, original_stat)
+
+def _prepend_csv_rows(path, df):
+    """
+    Writes new leading rows followed by the existing rows of a CSV asset file,
+    streaming the old rows byte-for-byte instead of re-parsing them.
+    """
+    tmp_path = _temp_path(path)
+    try:
+        with open(path, "rb") as src, open(tmp_path, "wb") as out:
+            out.write(src.readline())  # keep the existing header
+            out.write(df.to_csv(header=False).encode())
+            shutil.copyfileobj(src, out)
+            out.flush()
+            os.fsync(out.fileno())
+        _replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _scan_csv_offsets(path, index=None):
+    """
+    Builds (or, given an existing index, extends) the date -> byte offset index of a
+    CSV asset file by scanning the bytes after index["scanned"]. Only complete lines
+    are consumed; every CSV_INDEX_STRIDE-th row is sampled.
+    """
+    with open(path, "rb") as f:
+        if index is None:
+            data_start = len(f.readline())
+            index = {"data_start": data_start, "scanned": data_start, "rows": 0, "dates": [], "offsets": []}
+        f.seek(index["scanned"])
+        data = f.read()
+
+    buf = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(buf == ord("\n"))
+    starts = np.concatenate([[0], ends[:-1] + 1]) if len(ends) else np.empty(0, dtype="int64")
+    starts = starts[starts < ends]  # skip blank lines
+    rows = index["rows"] + np.arange(len(starts))
+    sampled = starts[rows % CSV_INDEX_STRIDE == 0]
+    dates = pd.to_datetime([data[s:s + 64].split(b",", 1)[0].decode() for s in sampled])
+
+    index["dates"] += [int(d) for d in dates.as_unit("ns").asi8]
+    index["offsets"] += [int(index["scanned"] + s) for s in sampled]
+    index["rows"] += len(starts)
+    index["scanned"] += int(ends[-1]) + 1 if len(ends) else 0
+    stat = os.stat(path)
+    index["file_size"], index["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+    return index
+
+def _save_csv_offset_index(path, index):
+    try:
+        tmp_path = _temp_path(path + ".idx")
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, path + ".idx")
+    except OSError as e:
+        print(f"Error writing offset index for {path}: {e}")
+
+def _load_csv_offset_index(path, stat):
+    """The sidecar index of `path` if it describes the file as of `stat`, else None."""
+    try:
+        with open(path + ".idx") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("file_size") != stat.st_size or index.get("mtime_ns") != stat.st_mtime_ns:
+        return None
+    return index
+
+def _csv_offset_index(path):
+    """Returns the offset index of a CSV asset file, rebuilding the sidecar if it is stale."""
+    index = _load_csv_offset_index(path, os.stat(path))
+    if index is None:
+        index = _scan_csv_offsets(path)
+        _save_csv_offset_index(path, index)
+    return index
+
+def _extend_csv_offset_index(path, original_stat):
+    """After an append, indexes just the new rows if the sidecar matched the file before it."""
+    index = _load_csv_offset_index(path, original_stat)
+    if index is not None:
+        _save_csv_offset_index(path, _scan_csv_offsets(path, index))
+
+def _read_csv_window(path, start, end, columns):
+    index = _csv_offset_index(path)
+    dates = np.asarray(index["dates"], dtype="int64")
+    offsets = index["offsets"]
+
+    begin, stop = index["data_start"], None
+    if start is not None and len(dates):
+        i = dates.searchsorted(start.value, side="right") - 1
+        if i > 0:
+            begin = offsets[i]
+    if end is not None and len(dates):
+        j = dates.searchsorted(end.value, side="right")
+        if j < len(offsets):
+            stop = offsets[j]
+
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(begin)
+        chunk = f.read() if stop is None else f.read(stop - begin)
+    names = header.decode().strip().split(",")
+    usecols = None if columns is None else [0] + [names.index(c) for c in columns if c in names[1:]]
+    df = pd.read_csv(io.BytesIO(header + chunk), index_col=0, parse_dates=True, usecols=usecols)
+    return df.loc[start:end]
+
+def _read_parquet_window(path, start, end, columns):
+    schema = pq.read_schema(path)
+    if columns is not None:
+        columns = [c for c in columns if c in schema.names]
+    index_columns = (schema.pandas_metadata or {}).get("index_columns", [])
+    filters = []
+    if index_columns and isinstance(index_columns[0], str):
+        if start is not None:
+            filters.append((index_columns[0], ">=", start))
+        if end is not None:
+            filters.append((index_columns[0], "<=", end))
+    df = pd.read_parquet(path, columns=columns, filters=filters or None)
+    return df.loc[start:end]
+
+def _file_span(path):
+    """(first, last) timestamp of an asset file without loading its rows, or None if empty."""
+    _recover_journal(path)
+    if path.endswith(".csv"):
+        bounds = _read_csv_bounds(path)
+        return None if bounds is None else bounds[1:]
+    # Reading just the index column of a columnar file is cheap
+    index = pd.read_parquet(path, columns=[]).index
+    return (index.min(), index.max()) if len(index) else None
+
+def _find_asset_file(ticker):
+    """Returns the existing file for a ticker, preferring the configured format."""
+    for fmt in [STORAGE_FORMAT] + [f for f in STORAGE_EXTENSIONS if f != STORAGE_FORMAT]:
+        if fmt == "parquet" and not HAS_PARQUET:
+            continue
+        path = get_asset_path(ticker, fmt)
+        if os.path.exists(path):
+            return path
+    return None
+
+# --- Catalog ---
+# One JSON manifest describing every stored asset, so status displays and sync gap
+# detection need neither directory scans nor file reads. Entries are keyed
+# "<ticker>|<interval>" and list each file they cover with the (mtime, size) it was
+# recorded at; an entry whose files changed behind its back is ignored.
+_catalog_lock = threading.Lock()
+_catalog_cache = {}
+
+def get_catalog_path():
+    return os.path.join(ASSETS_DIR, CATALOG_FILE)
+
+def catalog_key(ticker, interval=DAILY_INTERVAL):
+    return f"{ticker}|{interval}"
+
+def load_catalog():
+    """
+    Catalog entries {"<ticker>|<interval>": entry}, each holding first / last
+    timestamp, rows, crc32, last_sync and its per-file records. Re-read only when
+    the file changes. Treat as read-only.
+    """
+    path = get_catalog_path()
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {}
+    version = (path, stat.st_mtime_ns, stat.st_size)
+    if _catalog_cache.get("version") != version:
+        try:
+            with open(path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading catalog {path}: {e}")
+            entries = {}
+        _catalog_cache.update(version=version, entries=entries)
+    return _catalog_cache["entries"]
+
+def _file_record(path, rows=None, first=None, last=None, crc=0, start=0):
+    """
+    Catalog record of a file as it is now on disk. The crc32 continues from `crc`
+    over the bytes after `start` (so an append only checksums the new rows). Rows
+    are counted while checksumming when not given.
+    """
+    lines, last_byte = 0, b"\n"
+    with open(path, "rb") as f:
+        f.seek(start)
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            crc = zlib.crc32(chunk, crc)
+            lines += chunk.count(b"\n")
+            last_byte = chunk[-1:]
+        stat = os.fstat(f.fileno())
+    if rows is None:
+        if path.endswith(".parquet"):
+            rows = pq.ParquetFile(path).metadata.num_rows
+        else:
+            rows = lines - 1 + (last_byte != b"\n")  # minus the header
+    return {
+        "rows": int(rows),
+        "crc32": crc,
+        "first": pd.Timestamp(first).isoformat(),
+        "last": pd.Timestamp(last).isoformat(),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+    }
+
+def _record_matches(record, stat):
+    return record is not None and (record["mtime_ns"], record["size"]) == (stat.st_mtime_ns, stat.st_size)
+
+def _catalog_name(path):
+    return os.path.relpath(path, ASSETS_DIR).replace(os.sep, "/")
+
+def _summarize(records):
+    """Summary fields of an asset entry from its file records, in file order."""
+    return {
+        "first": min(r["first"] for r in records),
+        "last": max(r["last"] for r in records),
+        "rows": sum(r["rows"] for r in records),
+        # One file: its own checksum; partitions: a checksum of theirs, in order
+        "crc32": records[0]["crc32"] if len(records) == 1 else zlib.crc32(
+            json.dumps([r["crc32"] for r in records]).encode()
+        ),
+    }
+
+def _update_catalog(ticker, interval, records, last_sync=None):
+    """
+    Stores {path: file record} for one asset and refreshes its summary fields.
+    The read-modify-write holds the catalog's file lock as well, since the
+    dashboard, sync_daemon and sync_data update it from separate processes.
+    """
+    path = get_catalog_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _catalog_lock, _write_lock(path):
+        entries = dict(load_catalog())
+        key = catalog_key(ticker, interval)
+        files = dict(entries.get(key, {}).get("files", {}))
+        files.update({_catalog_name(p): r for p, r in records.items()})
+        # Files may be kept in both formats (see migrate_storage): the summary describes
+        # the format just written. catalog_entry reports the active one.
+        if interval == DAILY_INTERVAL:
+            ordered = list(records.values())
+        else:
+            exts = {os.path.splitext(p)[1] for p in records}
+            ordered = [files[name] for name in sorted(files) if os.path.splitext(name)[1] in exts]
+        entries[key] = dict(
+            {"ticker": ticker, "interval": interval},
+            **_summarize(ordered),
+            last_sync=last_sync or datetime.datetime.now().isoformat(timespec="seconds"),
+            files=files,
+        )
+
+        tmp_path = _temp_path(path)
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        _replace(tmp_path, path)
+        stat = os.stat(path)
+        _catalog_cache.update(version=(path, stat.st_mtime_ns, stat.st_size), entries=entries)
+
+def _catalog_file_record(path):
+    """The catalog's record of one file (as last written), or None."""
+    for entry in load_catalog().values():
+        record = entry["files"].get(_catalog_name(path))
+        if record is not None:
+            return record
+    return None
+
+def catalog_entry(ticker, interval=DAILY_INTERVAL):
+    """
+    The asset's catalog entry, or None if it has none or any file it lists was
+    changed since (checked with os.stat only). Entries describe the files loads
+    read (_find_asset_file, _list_partitions), whichever other formats are also recorded.
+    """
+    entry = load_catalog().get(catalog_key(ticker, interval))
+    if entry is None:
+        return None
+    if interval == DAILY_INTERVAL:
+        path = _find_asset_file(ticker)
+        record = entry["files"].get(_catalog_name(path)) if path else None
+        try:
+            if not _record_matches(record, os.stat(path)):
+                return None
+        except OSError:
+            return None
+        return dict(entry, **{k: record[k] for k in ("rows", "crc32", "first", "last")})
+    for name, record in entry["files"].items():
+        try:
+            stat = os.stat(os.path.join(ASSETS_DIR, name))
+        except OSError:
+            return None
+        if not _record_matches(record, stat):
+            return None
+    active = sorted(_catalog_name(p) for p in _list_partitions(ticker, interval).values())
+    if not active or any(name not in entry["files"] for name in active):
+        return None
+    return dict(entry, **_summarize([entry["files"][name] for name in active]))
+
+def catalog_asset(ticker, interval=DAILY_INTERVAL):
+    """
+    Catalogs an asset's stored files as they are now (e.g. written before the
+    catalog existed, or by hand) and returns its entry, or None if nothing is stored.
+    """
+    if interval == DAILY_INTERVAL:
+        path = _find_asset_file(ticker)
+        paths = [path] if path else []
+    else:
+        paths = list(_list_partitions(ticker, interval).values())
+    records = {}
+    for path in paths:
+        try:
+            span = _file_span(path)
+            if span is not None:
+                records[path] = _file_record(path, first=span[0], last=span[1])
+        except Exception as e:
+            print(f"Error cataloging {path}: {e}")
+    if not records:
+        return None
+    mtime = max(r["mtime_ns"] for r in records.values()) / 1e9
+    _update_catalog(ticker, interval, records, datetime.datetime.fromtimestamp(mtime).isoformat(timespec="seconds"))
+    return catalog_entry(ticker, interval)
+
+def stored_entry(ticker, interval=DAILY_INTERVAL):
+    """The asset's catalog entry, cataloguing its files first if the entry is missing or stale."""
+    return catalog_entry(ticker, interval) or catalog_asset(ticker, interval)
+
+def rebuild_catalog():
+    """
+    Catalogs every stored asset file from scratch (e.g. files written before the
+    catalog existed, or by hand). Returns the number of entries written.
+    """
+    count = 0
+    for ticker in get_base_tickers():
+        if ticker == "USD":
+            continue
+        for interval in [DAILY_INTERVAL] + list(INTERVALS):
+            if catalog_asset(ticker, interval) is not None:
+                count += 1
+    return count
+
+class RateLimiter:
+    """
+    Thread-safe token bucket shared by every Yahoo Finance request.
+    The refill rate halves whenever the provider answers with a rate-limit error
+    (and all callers pause for the cooldown), then creeps back up on each success.
+    """
+
+    def __init__(self, rate=1.0 / FETCH_DELAY, burst=2, min_rate=0.05, max_rate=4.0, recovery=0.05):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.recovery = recovery
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._blocked_until:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                else:
+                    wait = self._blocked_until - now
+            time.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.recovery)
+
+    def on_rate_limited(self, cooldown):
+        """Halves the request rate and holds every caller back for `cooldown` seconds."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+            self._blocked_until = max(self._blocked_until, self._updated + cooldown)
+
+# Global limiter used by retry_yf_download unless a caller supplies its own
+RATE_LIMITER = RateLimiter()
+
+def retry_yf_download(tickers, start, end, max_retries=3, downloader=None, limiter=None,
+                      interval=DAILY_INTERVAL):
     """
     Downloads data with exponential backoff for rate limits.
     Returns the full OHLCV dataframe.
+
+    `downloader` defaults to yf.download and can be replaced by any callable with
+    the same signature (e.g. a local fake for tests). Requests are paced by `limiter`
+    (default: the shared RATE_LIMITER) rather than fixed sleeps. `interval` is
+    passed on to the downloader for anything other than daily bars.
     """
     if not tickers:
         return pd.DataFrame()
+    downloader = downloader or yf.download
+    limiter = limiter or RATE_LIMITER
+    extra = {} if interval == DAILY_INTERVAL else {"interval": interval}
         
     for i in range(max_retries):
-        # Even before first try, be a bit nice if we are in a loop
-        time.sleep(random.uniform(0.5, 1.5))
+        limiter.acquire()
         try:
             # auto_adjust=False to avoid deprecation warning in yfinance >=0.2.50
-            data = yf.download(tickers, start=start, end=end, progress=False, auto_adjust=False)
+            data = downloader(tickers, start=start, end=end, progress=False, auto_adjust=False, **extra)
             if data is not None and not data.empty:
+                limiter.on_success()
                 return data
             # If empty but no exception, might be weekend/holiday or rate limited
             # yfinance 0.2.55 sometimes returns empty df on rate limit without raising
@@ -89,7 +755,7 @@ def retry_yf_download(tickers, start, end, max_retries=3):
         except Exception as e:
             msg = str(e)
             if "Too Many Requests" in msg or "Rate limit" in msg or "rate" in msg.lower():
-                # More aggressive backoff: 5s, 15s, 45s...
+                # More aggressive backoff: 5s, 15s, 45s... shared by every worker via the limiter
                 wait_time = (5 * (3 ** i)) + random.uniform(2, 5)
                 warning_text = f"Yahoo rate limit hit. Retrying in {wait_time:.1f}s... (Attempt {i+1}/{max_retries})"
                 print(warning_text)
@@ -97,7 +763,7 @@ def retry_yf_download(tickers, start, end, max_retries=3):
                     st.toast(warning_text)
                 except:
                     pass
-                time.sleep(wait_time)
+                limiter.on_rate_limited(wait_time)
             else:
                 print(f"YFinance Error: {e}")
                 # Don't break on first error if it's intermittent, but for now we follow old logic
@@ -109,25 +775,199 @@ def ensure_dataframe(data):
         return data.to_frame()
     return pd.DataFrame() if data is None else data
 
-def load_asset_data(ticker):
-    """Loads OHLCV data for a single asset from its CSV file."""
-    path = get_asset_path(ticker)
-    if os.path.exists(path):
+def _cache_get(path, stat):
+    with _asset_cache_lock:
+        entry = _asset_cache.get(path)
+        if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            _asset_cache.move_to_end(path)
+            _asset_cache_stats["hits"] += 1
+            return entry[3]
+        _asset_cache_stats["misses"] += 1
+        return None
+
+def _cache_put(path, stat, df):
+    nbytes = int(df.memory_usage(index=True, deep=False).sum())
+    with _asset_cache_lock:
+        _asset_cache[path] = (stat.st_mtime_ns, stat.st_size, nbytes, df)
+        _asset_cache.move_to_end(path)
+        total = sum(entry[2] for entry in _asset_cache.values())
+        while total > ASSET_CACHE_MAX_BYTES and len(_asset_cache) > 1:
+            _, evicted = _asset_cache.popitem(last=False)
+            total -= evicted[2]
+            _asset_cache_stats["evictions"] += 1
+
+def get_cache_stats():
+    """
+    Returns hit/miss/eviction counters and current size of the in-memory caches:
+    whole asset frames (_load_cached) and the Close columns of CLOSE_MATRIX, where
+    a column reused without reading its file counts as a hit.
+    """
+    with _asset_cache_lock:
+        stats = dict(_asset_cache_stats)
+        stats["entries"] = len(_asset_cache)
+        stats["bytes"] = sum(entry[2] for entry in _asset_cache.values())
+    close_stats = CLOSE_MATRIX.stats()
+    stats["hits"] += close_stats["hits"]
+    stats["misses"] += close_stats["misses"]
+    stats["close_columns"] = close_stats["columns"]
+    stats["bytes"] += close_stats["bytes"]
+    return stats
+
+def clear_asset_cache():
+    """Drops every cached asset frame and resets the counters."""
+    with _asset_cache_lock:
+        _asset_cache.clear()
+        for k in _asset_cache_stats:
+            _asset_cache_stats[k] = 0
+
+def _load_cached(path):
+    """Reads an asset file (or partition) through the in-process cache."""
+    _recover_journal(path)
+    stat = os.stat(path)
+    df = _cache_get(path, stat)
+    if df is None:
+        with profiling.span("loader.read_asset_file") as record:
+            df = _read_asset_file(path)
+            record["rows"] = len(df)
+        _cache_put(path, stat, df)
+    return df
+
+def load_asset_data(ticker, interval=DAILY_INTERVAL, start=None, end=None):
+    """
+    Loads OHLCV data for a single asset from its local file.
+    Results are served from an in-process cache until the file's mtime or size
+    changes. The returned frame is shared between callers and must not be mutated.
+
+    Intraday intervals read only the partitions overlapping [start, end] and
+    return that window (timestamps in UTC); daily data is returned in full.
+    """
+    if interval != DAILY_INTERVAL:
+        return _load_partitions(ticker, interval, start, end)
+
+    path = _find_asset_file(ticker)
+    if path:
         try:
-            return pd.read_csv(path, index_col=0, parse_dates=True)
+            return _load_cached(path)
         except Exception as e:
             print(f"Error loading {ticker} from {path}: {e}")
     return pd.DataFrame()
 
-def save_asset_data(ticker, df):
-    """Saves OHLCV data for a single asset to its CSV file, merging with existing data."""
+def _partitions_in_window(ticker, interval, start, end):
+    """Paths of the partitions that overlap [start, end] (None = unbounded)."""
+    return [
+        path for period, path in _list_partitions(ticker, interval).items()
+        if not ((start is not None and period.end_time < start) or (end is not None and period.start_time > end))
+    ]
+
+def _load_partitions(ticker, interval, start=None, end=None):
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    frames = []
+    for path in _partitions_in_window(ticker, interval, start, end):
+        try:
+            frames.append(_load_cached(path))
+        except Exception as e:
+            print(f"Error loading {ticker} from {path}: {e}")
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames) if len(frames) > 1 else frames[0]
+    if start is not None or end is not None:
+        df = df.loc[start:end]
+    return df
+
+def read_asset_window(ticker, start=None, end=None, columns=None, interval=DAILY_INTERVAL):
+    """
+    Reads only `columns` (None = all) and the rows in [start, end] (None = unbounded)
+    of an asset. CSV files are seeked via their offset sidecar and Parquet files are
+    filtered by row-group statistics, so a one-year window of a 25-year history reads
+    a few percent of the file. Unlike load_asset_data, the result is not cached.
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    if interval == DAILY_INTERVAL:
+        path = _find_asset_file(ticker)
+        paths = [path] if path else []
+    else:
+        paths = _partitions_in_window(ticker, interval, start, end)
+
+    frames = []
+    for path in paths:
+        _recover_journal(path)
+        try:
+            with profiling.span("loader.read_asset_window") as record:
+                reader = _read_parquet_window if path.endswith(".parquet") else _read_csv_window
+                frames.append(reader(path, start, end, columns))
+                record["rows"] = len(frames[-1])
+        except Exception as e:
+            print(f"Error reading {ticker} from {path}: {e}")
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames) if len(frames) > 1 else frames[0]
+
+def save_asset_data(ticker, df, interval=DAILY_INTERVAL):
+    """
+    Saves OHLCV data for a single asset in the configured format, merging with existing data.
+    For CSV storage, rows that fall entirely after (or before) the stored range are
+    appended (or prepended) without re-reading the existing rows; overlapping
+    updates fall back to a full merge and rewrite.
+
+    Intraday rows are split by partition and each partition file is merged the same
+    way, so a new day of minute bars only touches the current month's file.
+    """
     if df.empty:
         return
-        
-    path = get_asset_path(ticker)
+
+    df = df.sort_index()
+    df = df[~df.index.duplicated(keep='last')]
+
+    if interval == DAILY_INTERVAL:
+        path = get_asset_path(ticker)
+        _update_catalog(ticker, interval, {path: _merge_into_file(path, df, lambda: load_asset_data(ticker))})
+        return
+
+    folder = get_partition_dir(ticker, interval)
+    existing = _list_partitions(ticker, interval)
+    ext = STORAGE_EXTENSIONS[STORAGE_FORMAT]
+    records = {}
+    for period, part in df.groupby(df.index.to_period(INTERVALS[interval]["partition"])):
+        found = existing.get(period)
+        load_existing = (lambda p=found: _load_cached(p)) if found else pd.DataFrame
+        path = os.path.join(folder, f"{period}{ext}")
+        records[path] = _merge_into_file(path, part, load_existing)
+    _update_catalog(ticker, interval, records)
+
+def _merge_into_file(path, df, load_existing):
+    """
+    Merges sorted, de-duplicated rows into one asset file (see save_asset_data).
+    Returns the file's new catalog record; after an append its checksum and row
+    count extend the previous record instead of rescanning the file.
+    """
     os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _write_lock(path):
+        return _merge_locked(path, df, load_existing)
+
+def _merge_locked(path, df, load_existing):
+    if path.endswith(".csv") and os.path.exists(path):
+        _recover_journal(path, locked=True)
+        stat = os.stat(path)
+        previous = _catalog_file_record(path)
+        known = previous if _record_matches(previous, stat) else None
+        bounds = _read_csv_bounds(path)
+        if bounds is not None:
+            columns, first_date, last_date = bounds
+            if set(df.columns) <= set(columns):
+                if df.index.min() > last_date:
+                    _append_csv_rows(path, df.reindex(columns=columns))
+                    if known is None:
+                        return _file_record(path, first=first_date, last=df.index.max())
+                    return _file_record(path, rows=known["rows"] + len(df), first=first_date,
+                                        last=df.index.max(), crc=known["crc32"], start=stat.st_size)
+                if df.index.max() < first_date:
+                    _prepend_csv_rows(path, df.reindex(columns=columns))
+                    rows = known["rows"] + len(df) if known else None
+                    return _file_record(path, rows=rows, first=df.index.min(), last=last_date)
     
-    existing_df = load_asset_data(ticker)
+    existing_df = load_existing()
     if not existing_df.empty:
         # Merge and deduplicate
         combined = pd.concat([existing_df, df]).sort_index()
@@ -135,18 +975,105 @@ def save_asset_data(ticker, df):
     else:
         combined = df
         
-    combined.to_csv(path)
+    _write_asset_file(combined, path)
+    return _file_record(path, rows=len(combined), first=combined.index[0], last=combined.index[-1])
 
-def fetch_data_with_persistence(tickers, start_date, end_date):
+def migrate_storage(fmt="parquet"):
     """
-    Fetches OHLCV data for multiple tickers, syncing with local storage.
-    Returns a combined 'Close' price dataframe for the requested range.
+    One-shot conversion of every asset file in ASSETS_DIR, daily files and intraday
+    partitions, to the given format. Source files are left in place. Returns the
+    list of written paths.
+    """
+    if fmt == "parquet" and not HAS_PARQUET:
+        raise RuntimeError("Parquet storage requires pyarrow (pip install pyarrow).")
+    if not os.path.exists(ASSETS_DIR):
+        return []
+
+    written = []
+    target_ext = STORAGE_EXTENSIONS[fmt]
+    tickers_by_name = {_clean_name(t): t for t in get_base_tickers()}
+    for f in sorted(os.listdir(ASSETS_DIR)):
+        name, ext = os.path.splitext(f)
+        if ext == target_ext or ext not in STORAGE_EXTENSIONS.values():
+            continue
+        src = os.path.join(ASSETS_DIR, f)
+        dst = os.path.join(ASSETS_DIR, name + target_ext)
+        try:
+            df = _read_asset_file(src)
+            _write_asset_file(df, dst)
+            written.append(dst)
+            ticker = tickers_by_name.get(name)
+            if ticker is not None and len(df):
+                _update_catalog(ticker, DAILY_INTERVAL, {dst: _file_record(dst, len(df), df.index[0], df.index[-1])})
+        except Exception as e:
+            print(f"Error migrating {src}: {e}")
+
+    for ticker in tickers_by_name.values():
+        for interval in INTERVALS:
+            records = {}
+            for period, ext, src in _partition_files(ticker, interval):
+                if ext == target_ext:
+                    continue
+                dst = os.path.splitext(src)[0] + target_ext
+                try:
+                    df = _read_asset_file(src)
+                    _write_asset_file(df, dst)
+                    written.append(dst)
+                    if len(df):
+                        records[dst] = _file_record(dst, len(df), df.index[0], df.index[-1])
+                except Exception as e:
+                    print(f"Error migrating {src}: {e}")
+            if records:
+                _update_catalog(ticker, interval, records)
+    return written
+
+def export_asset_csv(ticker, path=None):
+    """
+    Writes a ticker's data as CSV (e.g. for sharing a Parquet-backed store). The
+    store's own CSV file (the default path) is replaced atomically under its write
+    lock and re-catalogued.
+    """
+    df = load_asset_data(ticker)
+    if df.empty:
+        return None
+    live_path = get_asset_path(ticker, "csv")
+    path = path or live_path
+    if os.path.abspath(path) != os.path.abspath(live_path):
+        _write_asset_file(df, path)
+        return path
+    with _write_lock(path):
+        if os.path.exists(path):
+            _recover_journal(path, locked=True)
+        _write_asset_file(df, path)
+        _update_catalog(ticker, DAILY_INTERVAL, {path: _file_record(path, len(df), df.index[0], df.index[-1])})
+    return path
+
+def resolve_sync_window(start_date, end_date, interval=DAILY_INTERVAL, settled=False):
+    """
+    Converts a requested date range into the (start_dt, end_dt) actually synced.
+    With `settled`, the caller knows the bars before end_date are final (e.g. it runs
+    after the market close, see sync_daemon) and end_date is used as given.
     """
-    # Convert dates to datetime for comparison
     start_dt = pd.to_datetime(start_date)
+    if interval != DAILY_INTERVAL:
+        # Intraday bars are stored in UTC and can be synced up to now, but only
+        # within the interval's lookback
+        now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+        earliest = now - pd.Timedelta(days=INTERVALS[interval]["lookback_days"] - 1)
+        return max(start_dt, earliest), min(pd.to_datetime(end_date), now)
+    if settled:
+        return start_dt, pd.to_datetime(end_date)
     # yfinance 'Close' data for today might not be available yet.
     yesterday = datetime.datetime.now() - datetime.timedelta(days=1)
     end_dt = min(pd.to_datetime(end_date), pd.to_datetime(yesterday.date()))
+    return start_dt, end_dt
+
+def fetch_data_with_persistence(tickers, start_date, end_date):
+    """
+    Fetches OHLCV data for multiple tickers, syncing with local storage.
+    Returns a combined 'Close' price dataframe for the requested range.
+    """
+    start_dt, end_dt = resolve_sync_window(start_date, end_date)
     
     # Sync each ticker individually
     for ticker in tickers:
@@ -155,66 +1082,300 @@ def fetch_data_with_persistence(tickers, start_date, end_date):
         
     return get_close_prices(tickers, start_dt, end_dt)
 
-def sync_asset(ticker, start_dt, end_dt):
-    """Syncs a single asset's local storage with Yahoo Finance."""
-    existing_df = load_asset_data(ticker)
-    
+def get_stored_span(ticker, interval=DAILY_INTERVAL):
+    """(first, last) stored timestamp of a ticker (from the catalog when current), or None."""
+    entry = catalog_entry(ticker, interval)
+    if entry is not None:
+        return pd.Timestamp(entry["first"]), pd.Timestamp(entry["last"])
+    if interval == DAILY_INTERVAL:
+        path = _find_asset_file(ticker)
+        paths = [path] if path else []
+    else:
+        # Only the oldest and newest partitions matter
+        paths = list(_list_partitions(ticker, interval).values())
+    if not paths:
+        return None
+    try:
+        first, last = _file_span(paths[0]), _file_span(paths[-1])
+    except Exception as e:
+        print(f"Error reading stored range of {ticker}: {e}")
+        return None
+    if first is None or last is None:
+        return None
+    return first[0], last[1]
+
+def get_missing_ranges(ticker, start_dt, end_dt, interval=DAILY_INTERVAL):
+    """Returns the (start, end) ranges of [start_dt, end_dt] not yet in local storage."""
+    step = pd.Timedelta(days=1) if interval == DAILY_INTERVAL else pd.Timedelta(INTERVALS[interval]["step"])
+    span = get_stored_span(ticker, interval)
+
     fetch_ranges = []
     
-    if existing_df.empty:
+    if span is None:
         fetch_ranges.append((start_dt, end_dt))
     else:
-        cache_start = existing_df.index.min()
-        cache_end = existing_df.index.max()
+        cache_start, cache_end = span
         
-        # Need earlier data?
-        if start_dt < cache_start:
-            fetch_ranges.append((start_dt, cache_start - pd.Timedelta(days=1)))
+        # Need earlier data? For intraday bars the lookback start moves with the
+        # clock, so a gap of less than a day (e.g. an overnight close) is not backfilled
+        lead = pd.Timedelta(0) if interval == DAILY_INTERVAL else pd.Timedelta(days=1)
+        if start_dt < cache_start - lead:
+            fetch_ranges.append((start_dt, cache_start - step))
         
         # Need newer data?
         if end_dt > cache_end:
-            fetch_ranges.append((cache_end + pd.Timedelta(days=1), end_dt))
+            fetch_ranges.append((cache_end + step, end_dt))
 
-    for fetch_start, fetch_end in fetch_ranges:
-        if fetch_start >= fetch_end:
-            continue
-        new_data = retry_yf_download([ticker], fetch_start, fetch_end)
-        if not new_data.empty:
-            # Standardize to TZ-naive
-            if new_data.index.tz is not None:
-                new_data.index = new_data.index.tz_localize(None)
-                
-            # Flatten multi-index if it exists (yfinance >=0.2.50)
-            if isinstance(new_data.columns, pd.MultiIndex):
-                new_data.columns = new_data.columns.get_level_values(0)
-            save_asset_data(ticker, new_data)
-        # Rate-limit-friendly delay between API calls
-        time.sleep(FETCH_DELAY)
-
-def get_close_prices(tickers, start_date, end_date):
-    """Combines 'Close' prices from individual asset files into a single dataframe."""
+    return [(s, e) for s, e in fetch_ranges if s < e]
+
+def _split_range(start, end, days):
+    """Cuts [start, end] into consecutive pieces spanning at most `days` each."""
+    pieces = []
+    while start < end:
+        piece_end = min(start + pd.Timedelta(days=days), end)
+        pieces.append((start, piece_end))
+        start = piece_end
+    return pieces
+
+def extract_ticker_frame(data, ticker, utc=False):
+    """
+    Returns one ticker's OHLCV frame from a yfinance download, which may hold
+    several tickers under (Price, Ticker) MultiIndex columns. Index is made TZ-naive;
+    with `utc`, timestamps are converted to UTC first (intraday bars from different
+    exchanges must share one clock).
+    """
+    if data.empty:
+        return pd.DataFrame()
+    if isinstance(data.columns, pd.MultiIndex):
+        if ticker not in data.columns.get_level_values(-1):
+            return pd.DataFrame()
+        data = data.xs(ticker, axis=1, level=-1)
+    data = data.dropna(how='all')
+    # Standardize to TZ-naive
+    if data.index.tz is not None:
+        if utc:
+            data = data.tz_convert("UTC")
+        data = data.tz_localize(None)
+    return data
+
+def sync_asset(ticker, start_dt, end_dt, downloader=None, limiter=None, interval=DAILY_INTERVAL):
+    """Syncs a single asset's local storage with Yahoo Finance."""
+    intraday = interval != DAILY_INTERVAL
+    for missing_start, missing_end in get_missing_ranges(ticker, start_dt, end_dt, interval):
+        # Intraday requests may only span a few days each
+        pieces = (_split_range(missing_start, missing_end, INTERVALS[interval]["request_days"])
+                  if intraday else [(missing_start, missing_end)])
+        for fetch_start, fetch_end in pieces:
+            # Pacing between calls is handled by the shared rate limiter
+            new_data = retry_yf_download([ticker], fetch_start, fetch_end, downloader=downloader,
+                                         limiter=limiter, interval=interval)
+            new_data = extract_ticker_frame(new_data, ticker, utc=intraday)
+            if not new_data.empty:
+                save_asset_data(ticker, new_data, interval)
+
+def asset_file_version(ticker):
+    """(path, mtime_ns, size) of a ticker's daily file, or None; changes whenever it is written."""
+    path = _find_asset_file(ticker)
+    if not path:
+        return None
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+class CloseMatrix:
+    """
+    Date-aligned Close prices for every loaded asset: one block of shape
+    (union calendar x tickers, CLOSE_DTYPE by default) with NaN where an asset has
+    no bar. The calendar is stored once for all tickers.
+
+    A ticker's column is rebuilt only when its file (path, mtime, size) changes or a
+    request reaches outside the date span loaded so far (which is then widened), so
+    get_close_prices reduces to slicing rows and picking columns. Only the Close
+    column of the needed rows is read from disk (see read_asset_window).
+    """
+
+    def __init__(self, dtype=None):
+        self.index = pd.DatetimeIndex([], name="Date")
+        self.values = np.empty((0, 0), dtype=dtype or CLOSE_DTYPE)
+        self.columns = []
+        self._col_pos = {}
+        self._versions = {}
+        self._spans = {}
+        self._stats = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def stats(self):
+        """Column reuse counters (hits: no file read needed) and the block's size."""
+        with self._lock:
+            return dict(self._stats, columns=len(self.columns), bytes=self.values.nbytes)
+
+    def _version(self, ticker):
+        return asset_file_version(ticker)
+
+    def invalidate(self, tickers):
+        """Forgets what was loaded for `tickers`; the next refresh re-reads them."""
+        with self._lock:
+            for ticker in tickers:
+                self._versions.pop(ticker, None)
+                self._spans.pop(ticker, None)
+
+    def _load_close(self, ticker, start_dt, end_dt):
+        df = read_asset_window(ticker, start_dt, end_dt, columns=['Close'])
+        if df.empty or 'Close' not in df.columns:
+            return None
+        close = df['Close']
+        # Standardize index to TZ-naive for safe alignment
+        if close.index.tz is not None:
+            close = close.tz_localize(None)
+        return close[~close.index.duplicated(keep='last')].sort_index()
+
+    def refresh(self, tickers, start_dt=None, end_dt=None, on_loaded=None):
+        """
+        Brings the columns for `tickers` up to date with their asset files over
+        [start_dt, end_dt] (None = unbounded). Files are read on a thread pool;
+        `on_loaded(ticker)` is called from the calling thread as each ticker is ready
+        (at once for tickers that needed no read).
+        """
+        with self._lock:
+            updates, to_read = {}, {}
+            for ticker in tickers:
+                if ticker == "USD":
+                    continue
+                version = self._version(ticker)
+                span = self._spans.get(ticker) if version == self._versions.get(ticker) else None
+                if version is not None and span is not None and _span_covers(span, start_dt, end_dt):
+                    self._stats["hits"] += 1
+                    if on_loaded:
+                        on_loaded(ticker)
+                    continue
+                # An unchanged file keeps what was loaded: the span only grows
+                span = (start_dt, end_dt) if span is None else _widen_span(span, start_dt, end_dt)
+                updates[ticker] = None
+                if version:
+                    to_read[ticker] = span
+                    self._stats["misses"] += 1
+                elif on_loaded:
+                    on_loaded(ticker)
+                self._versions[ticker] = version
+                self._spans[ticker] = span
+            if not updates:
+                return
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=LOAD_WORKERS) as pool:
+                load_close = profiling.bind(self._load_close)
+                futures = {pool.submit(load_close, ticker, *span): ticker for ticker, span in to_read.items()}
+                for future in concurrent.futures.as_completed(futures):
+                    updates[futures[future]] = future.result()
+                    if on_loaded:
+                        on_loaded(futures[future])
+
+            new_index = self.index
+            for series in updates.values():
+                if series is not None and not series.index.isin(new_index).all():
+                    new_index = new_index.union(series.index)
+            new_columns = [t for t, s in updates.items() if s is not None and t not in self._col_pos]
+            if not new_index.equals(self.index) or new_columns:
+                # One reallocation per refresh: re-align existing columns onto the grown
+                # calendar and make room for every new ticker at once
+                values = np.full((len(new_index), len(self.columns) + len(new_columns)), np.nan, dtype=self.values.dtype)
+                values[new_index.get_indexer(self.index), :len(self.columns)] = self.values
+                self.index, self.values = new_index.rename("Date"), values
+                for ticker in new_columns:
+                    self._col_pos[ticker] = len(self.columns)
+                    self.columns.append(ticker)
+
+            for ticker, series in updates.items():
+                if ticker not in self._col_pos:
+                    continue
+                column = self.values[:, self._col_pos[ticker]]
+                column[:] = np.nan
+                if series is not None:
+                    column[self.index.get_indexer(series.index)] = series.to_numpy()
+
+    def select(self, tickers, start_dt, end_dt):
+        """Returns the [start_dt, end_dt] x tickers block (rows where any ticker has data)."""
+        with self._lock:
+            return select_close_block(self.index, self.values, self.columns, tickers, start_dt, end_dt)
+
+    def snapshot(self, tickers):
+        """Returns (index, values, columns) for `tickers` over the whole calendar, as a copy."""
+        with self._lock:
+            names = [t for t in tickers if t in self._col_pos]
+            values = self.values[:, [self._col_pos[t] for t in names]]
+            return self.index, values, names
+
+def _span_covers(span, start_dt, end_dt):
+    lo, hi = span
+    return ((lo is None or (start_dt is not None and lo <= start_dt))
+            and (hi is None or (end_dt is not None and hi >= end_dt)))
+
+def _widen_span(span, start_dt, end_dt):
+    lo, hi = span
+    lo = None if lo is None or start_dt is None else min(lo, start_dt)
+    hi = None if hi is None or end_dt is None else max(hi, end_dt)
+    return lo, hi
+
+def select_close_block(index, values, columns, tickers, start_dt, end_dt):
+    """
+    Slices a (calendar x tickers) Close block to [start_dt, end_dt] and the given
+    tickers, keeping only rows where at least one of them has data.
+    """
+    pos = {c: i for i, c in enumerate(columns)}
+    cols = [pos[t] for t in tickers if t in pos]
+    names = [t for t in tickers if t in pos]
+    if not cols:
+        return pd.DataFrame()
+    lo = index.searchsorted(start_dt, side="left")
+    hi = index.searchsorted(end_dt, side="right")
+    block = values[lo:hi, cols]
+    present = ~np.isnan(block).all(axis=1)
+    return pd.DataFrame(block[present], index=index[lo:hi][present], columns=names)
+
+# Shared across Streamlit reruns, like the asset cache it is built from
+CLOSE_MATRIX = CloseMatrix()
+
+def get_close_prices(tickers, start_date, end_date, interval=DAILY_INTERVAL, on_loaded=None):
+    """
+    Combines 'Close' prices from individual asset files into a single dataframe.
+    `on_loaded(ticker)` reports progress as each daily series is loaded (see CloseMatrix.refresh).
+    Intraday closes are returned on the union of their timestamps without filling;
+    process_data aligns them as-of (see INTERVALS[interval]["asof_tolerance"]).
+    """
     start_dt = pd.to_datetime(start_date)
     end_dt = pd.to_datetime(end_date)
-    
-    combined_close = pd.DataFrame()
-    
-    for ticker in tickers:
-        if ticker == "USD":
-            continue
-            
-        df = load_asset_data(ticker)
-        if not df.empty and 'Close' in df.columns:
-            # Standardize index to TZ-naive for safe joining
-            if df.index.tz is not None:
-                df.index = df.index.tz_localize(None)
-            subset = df.loc[start_dt:end_dt, 'Close']
-            # Using concat or join for better index safety
-            if combined_close.empty:
-                combined_close = subset.to_frame(name=ticker)
-            else:
-                combined_close = combined_close.join(subset.to_frame(name=ticker), how='outer')
-            
-    return combined_close.ffill()
+
+    tickers = [t for t in dict.fromkeys(tickers) if t != "USD"]
+    if interval != DAILY_INTERVAL:
+        with profiling.span("loader.intraday_partitions") as record:
+            closes = {}
+            for ticker in tickers:
+                df = read_asset_window(ticker, start_dt, end_dt, columns=['Close'], interval=interval)
+                if not df.empty and 'Close' in df.columns:
+                    closes[ticker] = df['Close']
+            result = pd.DataFrame(closes).rename_axis("Date")
+            record["rows"] = len(result)
+        return result
+
+    with profiling.span("loader.close_matrix_refresh"):
+        CLOSE_MATRIX.refresh(tickers, start_dt, end_dt, on_loaded)
+    with profiling.span("loader.close_matrix_select") as record:
+        result = CLOSE_MATRIX.select(tickers, start_dt, end_dt).ffill()
+        record["rows"] = len(result)
+    return result
+
+def invalidate_assets(tickers):
+    """
+    Drops every in-process cache entry for `tickers`, e.g. after another process
+    (sync_daemon) rewrote their files.
+    """
+    paths = {get_asset_path(t, fmt) for t in tickers for fmt in STORAGE_EXTENSIONS}
+    with _asset_cache_lock:
+        for path in paths:
+            _asset_cache.pop(path, None)
+    CLOSE_MATRIX.invalidate(tickers)
+
+def get_required_fx_assets(assets):
+    """FX assets (keys of FX_PAIRS) that must be fetched to convert `assets` to USD."""
+    return currency_graph.get_graph(FX_PAIRS).required_fx_assets(assets, CURRENCY_MAPPING)
 
 def get_base_tickers():
     return list(ASSET_TICKERS.values())
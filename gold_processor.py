@@ -1,5 +1,8 @@
 import pandas as pd
 import numpy as np
+import warnings
+import currency_graph
+import profiling
 
 def calculate_metrics(gold_denominated_series):
     """
@@ -45,88 +48,379 @@ def calculate_metrics(gold_denominated_series):
         "Max Drawdown": max_drawdown
     }
 
-def process_data(raw_data, ticker_map, currency_map):
+def _first_last_valid(values):
+    """Row positions of the first and last non-NaN value in each column (0 if none)."""
+    valid = ~np.isnan(values)
+    first_pos = valid.argmax(axis=0)
+    last_pos = len(values) - 1 - valid[::-1].argmax(axis=0)
+    return valid, first_pos, last_pos
+
+def gap_returns(values):
+    """
+    Simple returns of each column of a (time x asset) array, taken between
+    consecutive valid observations (NaN gaps are skipped, like dropna().pct_change()).
+    NaN where a column has no value or no earlier one.
+    """
+    values = np.asarray(values, dtype="float64")
+    n_rows, n_cols = values.shape
+    valid = ~np.isnan(values)
+    returns = np.empty_like(values)
+    if n_rows == 0:
+        return returns
+    # Divide by the forward-filled previous row
+    fill_pos = np.maximum.accumulate(np.where(valid, np.arange(n_rows)[:, None], 0), axis=0)
+    returns[0] = np.nan
+    returns[1:] = values[fill_pos[:-1], np.arange(n_cols)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(values, returns, out=returns)
+    returns -= 1
+    return returns
+
+def underwater(values):
+    """Drawdown from the running peak of each column (fmax ignores NaN, so the peak skips gaps)."""
+    values = np.asarray(values, dtype="float64")
+    rolling_max = np.fmax.accumulate(values, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdown = values - rolling_max
+        drawdown /= rolling_max
+    return drawdown
+
+def calculate_metrics_matrix(values, index, returns=None, drawdown=None):
+    """
+    Vectorized calculate_metrics over every column of a 2-D (time x asset) array.
+    NaN gaps are skipped exactly like calculate_metrics' dropna: returns are taken
+    between consecutive valid observations. Returns a DataFrame with one row per column.
+    Precomputed gap_returns / underwater arrays of `values` are reused when given.
+    """
+    values = np.asarray(values, dtype="float64")
+    n_rows, n_cols = values.shape
+    cols = np.arange(n_cols)
+    if n_rows == 0:
+        return pd.DataFrame(0.0, index=cols, columns=["CAGR", "Volatility", "Max Drawdown"])
+    valid, first_pos, last_pos = _first_last_valid(values)
+    n_valid = valid.sum(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+
+        # CAGR — use first/last valid values
+        start_val = values[first_pos, cols]
+        end_val = values[last_pos, cols]
+        dates = np.asarray(index, dtype="datetime64[ns]")
+        days = (dates[last_pos] - dates[first_pos]) // np.timedelta64(1, "D")
+        years = days / 365.25
+        cagr = (end_val / start_val) ** (1 / years) - 1
+        cagr = np.where((years <= 0) | (start_val == 0) | np.isnan(start_val) | np.isnan(end_val), 0.0, cagr)
+
+        # Returns between consecutive valid values
+        if returns is None:
+            returns = gap_returns(values)
+
+        # Volatility (Annualized)
+        volatility = np.nanstd(returns, axis=0, ddof=1) * np.sqrt(252)
+        volatility = np.where(np.sum(~np.isnan(returns), axis=0) < 2, np.nan, volatility)
+
+        # Max Drawdown
+        if drawdown is None:
+            drawdown = underwater(values)
+        max_drawdown = np.nanmin(drawdown, axis=0)
+
+    too_short = n_valid < 2
+    return pd.DataFrame(
+        {
+            "CAGR": np.where(too_short, 0.0, cagr),
+            "Volatility": np.where(too_short, 0.0, volatility),
+            "Max Drawdown": np.where(too_short, 0.0, max_drawdown),
+        }
+    )
+
+def rolling_correlation_cube(returns, window, min_periods=None):
+    """
+    Rolling pairwise correlation of every column pair at once.
+
+    Sliding-window sums of x, y, x^2, y^2 and xy (restricted to rows where both
+    series are present) are taken as differences of cumulative sums, so each window
+    costs O(1) per pair instead of being recomputed: O(T * N^2) overall.
+
+    Returns a (T, N, N) array where cube[t] is the correlation matrix of the window
+    ending at row t; NaN until `min_periods` (default: window) paired observations.
+    """
+    x = np.asarray(returns, dtype="float64")
+    min_periods = window if min_periods is None else min_periods
+    mask = ~np.isnan(x)
+    # Correlation is shift-invariant; centering keeps the cumulative sums small
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        x = np.where(mask, x - np.nanmean(x, axis=0), 0.0)
+    m = mask.astype("float64")
+
+    def window_sums(a):
+        csum = np.cumsum(a, axis=0)
+        sums = csum.copy()
+        sums[window:] -= csum[:-window]
+        return sums
+
+    # Pairwise terms: [t, i, j] only counts rows where both i and j are present
+    n = window_sums(m[:, :, None] * m[:, None, :])
+    sx = window_sums(x[:, :, None] * m[:, None, :])
+    sxx = window_sums((x * x)[:, :, None] * m[:, None, :])
+    sxy = window_sums(x[:, :, None] * x[:, None, :])
+    sy = sx.transpose(0, 2, 1)
+    syy = sxx.transpose(0, 2, 1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = n * sxy - sx * sy
+        var = (n * sxx - sx * sx) * (n * syy - sy * sy)
+        cube = cov / np.sqrt(var)
+    cube[(n < max(min_periods, 2)) | ~(var > 0)] = np.nan
+    return np.clip(cube, -1.0, 1.0)
+
+def _apply_columns(prices, raw, idx, op):
+    """
+    prices[:, k] = op(prices[:, k], raw[:, idx[k]]) for every k with an index (op=None
+    assigns), in one broadcast. Columns whose index is None are left untouched.
+    """
+    cols = [k for k, i in enumerate(idx) if i is not None]
+    if not cols:
+        return
+    src = raw[:, [idx[k] for k in cols]]
+    if op is None:
+        prices[:, cols] = src
+    elif len(cols) == prices.shape[1]:
+        op(prices, src, out=prices)
+    else:
+        prices[:, cols] = op(prices[:, cols], src)
+
+def asof_fill(df, tolerance):
+    """
+    As-of alignment of series sampled at different timestamps: each cell takes its
+    column's latest observation at or before that row, provided it is at most
+    `tolerance` old (NaN otherwise).
+    """
+    values = df.to_numpy(dtype="float64")
+    if not len(values):
+        return df
+    times = df.index.as_unit("ns").asi8
+    rows = np.arange(len(values))[:, None]
+    last = np.maximum.accumulate(np.where(np.isnan(values), -1, rows), axis=0)
+    source = np.maximum(last, 0)
+    fresh = (last >= 0) & (times[:, None] - times[source] <= pd.Timedelta(tolerance).value)
+    filled = np.where(fresh, values[source, np.arange(values.shape[1])], np.nan)
+    return pd.DataFrame(filled, index=df.index, columns=df.columns)
+
+class ProcessedData:
+    """
+    Gold-denominated outputs of one process_prices call, each computed once over the
+    same (time x asset) block and shared by the metrics and the charts:
+    - normalized: prices in gold, indexed to 100 at each asset's first value (unless
+      processed with normalize=False)
+    - returns: simple returns between consecutive observations
+    - drawdown: fraction below the running peak (underwater curve)
+    - metrics: CAGR / Volatility / Max Drawdown per asset
+    """
+
+    def __init__(self, normalized, returns, drawdown, metrics):
+        self.normalized = normalized
+        self.returns = returns
+        self.drawdown = drawdown
+        self.metrics = metrics
+
+    @property
+    def assets(self):
+        return list(self.normalized.columns)
+
+# Denominators priced together by process_denominated (each must be an asset key;
+# USD is the synthetic dollar, i.e. plain USD prices)
+DENOMINATORS = ("GOLD", "SILVER", "BTC", "USD")
+
+class DenominatedData:
+    """
+    Every asset priced in several denominators at once. Each block (normalized,
+    returns, drawdown) is one (time x denominator*asset) array with the columns of
+    each denominator adjacent, so result[denominator] is a ProcessedData whose frames
+    are views of it: switching denominators slices, it does not recompute.
+    """
+
+    def __init__(self, index, assets, denominators, normalized, returns, drawdown, metrics):
+        self.index = index
+        self.assets = list(assets)
+        self.denominators = list(denominators)
+        self.blocks = {"normalized": normalized, "returns": returns, "drawdown": drawdown}
+        self.metrics = metrics  # indexed by (Denominator, Asset)
+
+    def __getitem__(self, denominator):
+        k = self.denominators.index(denominator)
+        cols = slice(k * len(self.assets), (k + 1) * len(self.assets))
+        frame = lambda values: pd.DataFrame(values[:, cols], index=self.index, columns=self.assets, copy=False)
+        return ProcessedData(
+            frame(self.blocks["normalized"]),
+            frame(self.blocks["returns"]),
+            frame(self.blocks["drawdown"]),
+            self.metrics.loc[denominator],
+        )
+
+    def cube(self, field="normalized"):
+        """One block as a (time x denominator x asset) array."""
+        return self.blocks[field].reshape(len(self.index), len(self.denominators), len(self.assets))
+
+def _conversion_plan(asset_names, ticker_map, currency_map, graph, col_pos):
+    """
+    For each asset that can be priced: its raw numerator column (None for a constant
+    1.0) and the (multiply, divide) raw columns of each FX hop to USD. Assets missing
+    from the data are skipped.
+    """
+    names, num_idx, hops = [], [], []
+    for asset_name in asset_names:
+        if asset_name not in ticker_map:
+            continue
+        asset_type = currency_map.get(asset_name)
+
+        if asset_type == "USD_CURRENCY":
+            # The US Dollar's price in USD is 1.0
+            num, terms = None, ()
+        elif asset_name not in col_pos:
+            # If it's a selected asset but missing from data (e.g. failed fetch)
+            # We skip or handle error. For now, skip to avoid Crash.
+            continue
+        elif asset_type is None:
+            raise ValueError(f"No currency configured for {asset_name}.")
+        else:
+            uses_own_price, terms = graph.conversion(asset_name, asset_type)
+            num = col_pos[asset_name] if uses_own_price else None
+
+        hop_idx = []
+        for fx_asset, exponent in terms:
+            if fx_asset not in col_pos:
+                raise ValueError(f"FX series {fx_asset} needed to convert {asset_name} is missing from result.")
+            hop_idx.append((col_pos[fx_asset], None) if exponent > 0 else (None, col_pos[fx_asset]))
+
+        names.append(asset_name)
+        num_idx.append(num)
+        hops.append(hop_idx)
+    return names, num_idx, hops
+
+def process_data(raw_data, ticker_map, currency_map, fx_pairs=None, asof_tolerance=None):
+    """(normalized, metrics) from process_prices; see there for the inputs."""
+    result = process_prices(raw_data, ticker_map, currency_map, fx_pairs, asof_tolerance)
+    return result.normalized, result.metrics
+
+@profiling.timed("processor.process_prices", input_rows=True)
+def process_prices(raw_data, ticker_map, currency_map, fx_pairs=None, asof_tolerance=None, assets=None,
+                   normalize=True):
+    """
+    Gold-denominated ProcessedData: normalized prices in Gold (base 100), returns,
+    drawdown and metrics. See process_denominated for the inputs.
+    """
+    return process_denominated(
+        raw_data, ticker_map, currency_map, fx_pairs, asof_tolerance, assets, denominators=("GOLD",),
+        normalize=normalize,
+    )["GOLD"]
+
+@profiling.timed("processor.process_denominated", input_rows=True)
+def process_denominated(raw_data, ticker_map, currency_map, fx_pairs=None, asof_tolerance=None, assets=None,
+                        denominators=DENOMINATORS, normalize=True):
     """
     Inputs:
     - raw_data: DataFrame with columns as Tickers (Close prices).
     - ticker_map: Dict mapping 'Friendly Name' -> 'Ticker'.
     - currency_map: Dict mapping 'Friendly Name' -> 'Currency Code' (or 'ExchRate').
-    
-    Returns:
-    - gold_denominated_df: DataFrame of assets priced in Gold, normalized to 100.
-    - metrics: Dict of metrics per asset.
+    - fx_pairs: Dict mapping FX asset name -> (base, quote) currency pair. Native
+      currencies are converted to USD through any chain of these pairs. Defaults to
+      reading every currency code in currency_map as a USD/<code> rate.
+    - asof_tolerance: For unfilled intraday closes (timestamps differ per asset), each
+      bar is denominated against the latest denominator / FX quote at or before it, if
+      no older than this (e.g. "15min"). Assets keep their own timestamps: rows where
+      an asset has no bar stay NaN. Daily closes arrive forward-filled already.
+    - assets: Friendly names to output, in this order (default: every key of
+      ticker_map). Names without data are skipped.
+    - denominators: Friendly names to price the assets in. Each needs data in
+      raw_data (and an entry in ticker_map), except the synthetic USD.
+    - normalize: Index each column to 100 at its first value. When off, the
+      "normalized" outputs hold the plain price ratios, which do not depend on
+      where raw_data starts (e.g. for extending persisted state bar by bar).
+
+    Returns a DenominatedData with normalized prices (base 100), returns, drawdown
+    and metrics for every asset in every denominator.
+
+    The USD prices are built once: each column is raw[:, numerator] * (FX hops),
+    computed in place straight from the raw prices. All denominators are then applied
+    in a single broadcast, usd[:, asset] / usd[:, denominator], written directly into
+    the output block.
     """
-    df = raw_data.copy()
-    
+    if fx_pairs is None:
+        fx_pairs = currency_graph.implied_usd_pairs(ticker_map, currency_map)
+    own_bars = None
+    if asof_tolerance is not None:
+        # Only the denominator / FX quotes are carried forward (see the mask below)
+        own_bars = raw_data.notna().to_numpy()
+        raw_data = asof_fill(raw_data, asof_tolerance)
+    graph = currency_graph.get_graph(fx_pairs)
+
     # Invert mapping to Ticker -> Friendly Name for easier column access
     inv_map = {v: k for k, v in ticker_map.items()}
-    df.rename(columns=inv_map, inplace=True)
-    
-    # Ensure Gold is present
-    if "GOLD" not in df.columns:
-        raise ValueError("Gold price data missing from result.")
-    
-    gold_price_usd = df["GOLD"]
-    
-    processed_df = pd.DataFrame(index=df.index)
-    
-    # Process each asset
-    for asset_name in ticker_map.keys():
-        if asset_name == "GOLD":
-            processed_df[asset_name] = 1.0 # Gold in terms of Gold is 1 (or 100 normalized)
-            continue
-            
-        asset_type = currency_map.get(asset_name)
-        
-        asset_price_usd = None
-        
-        if asset_type == "USD_CURRENCY":
-            # The asset IS the US Dollar. Its price in USD is 1.0.
-            asset_price_usd = 1.0
-        else:
-            if asset_name not in df.columns:
-                # If it's a selected asset but missing from data (e.g. failed fetch)
-                # We skip or handle error. For now, skip to avoid Crash.
-                continue
-            asset_price_raw = df[asset_name]
-            
-            if asset_type == "USD":
-                asset_price_usd = asset_price_raw
-                
-            elif asset_type == "ExchRate":
-                # Price_USD = 1 / Rate
-                asset_price_usd = 1.0 / asset_price_raw
-                
-            elif asset_type == "INR":
-                usdinr = df["INR"]
-                asset_price_usd = asset_price_raw / usdinr
-                
-            elif asset_type == "JPY":
-                usdjpy = df["JPY"]
-                asset_price_usd = asset_price_raw / usdjpy
-                
-            elif asset_type == "CNY":
-                usdcny = df["CNY"]
-                asset_price_usd = asset_price_raw / usdcny
-            
-        # Denominate in Gold
-        # Price_Au = Price_USD / Price_Gold_USD
-        processed_df[asset_name] = asset_price_usd / gold_price_usd
-
-    # Normalize to 100 at the first available data point
-    def normalize_series(s):
-        first_valid = s.first_valid_index()
-        if first_valid is not None:
-            first_val = s.loc[first_valid]
-            if first_val != 0:
-                return 100 * s / first_val
-        return s
-        
-    normalized_df = processed_df.apply(normalize_series)
-    
+    col_pos = {inv_map.get(c, c): i for i, c in enumerate(raw_data.columns)}
+
+    # Ensure every denominator is present
+    denominators = list(dict.fromkeys(denominators))
+    for denominator in denominators:
+        if denominator not in ticker_map or (
+            currency_map.get(denominator) != "USD_CURRENCY" and denominator not in col_pos
+        ):
+            name = "Gold" if denominator == "GOLD" else denominator
+            raise ValueError(f"{name} price data missing from result.")
+
+    raw = raw_data.to_numpy(dtype="float64")
+
+    # Output assets first, then any denominator that is not itself an output
+    names, num_idx, hops = _conversion_plan(
+        ticker_map.keys() if assets is None else dict.fromkeys(assets), ticker_map, currency_map, graph, col_pos
+    )
+    n_assets = len(names)
+    extra = _conversion_plan([d for d in denominators if d not in names], ticker_map, currency_map, graph, col_pos)
+    for part, more in zip((names, num_idx, hops), extra):
+        part += more
+    den_idx = [names.index(d) for d in denominators]
+
+    # Price_USD = Price_native * rate_1^±1 * rate_2^±1 ..., one broadcast per hop.
+    # Constant 1.0 factors are skipped.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        usd = np.ones((len(raw), len(names)), order="F")  # column-major: each asset contiguous
+        _apply_columns(usd, raw, num_idx, None)
+        for h in range(max((len(hop_idx) for hop_idx in hops), default=0)):
+            _apply_columns(usd, raw, [hop_idx[h][0] if h < len(hop_idx) else None for hop_idx in hops], np.multiply)
+            _apply_columns(usd, raw, [hop_idx[h][1] if h < len(hop_idx) else None for hop_idx in hops], np.divide)
+
+        # Denominate: Price_D = Price_USD / Price_D_USD for every denominator at once.
+        # Column k * n_assets + j of `prices` is asset j in denominator k; the
+        # (time, asset, denominator) view below addresses exactly those columns.
+        prices = np.empty((len(raw), len(denominators) * n_assets), order="F")
+        np.divide(
+            usd[:, :n_assets, None],
+            usd[:, den_idx][:, None, :],
+            out=prices.reshape((len(raw), n_assets, len(denominators)), order="F"),
+        )
+    for k, denominator in enumerate(denominators):
+        if denominator in names[:n_assets]:
+            # An asset in terms of itself is 1 (or 100 normalized)
+            prices[:, k * n_assets + names.index(denominator)] = 1.0
+    if own_bars is not None:
+        for j, name in enumerate(names[:n_assets]):
+            if name in col_pos:
+                prices.reshape((len(raw), n_assets, len(denominators)), order="F")[~own_bars[:, col_pos[name]], j, :] = np.nan
+
+    # Normalize to 100 at the first available data point (columns without one are left as-is)
+    if normalize and len(prices):
+        valid, first_pos, _ = _first_last_valid(prices)
+        first_val = prices[first_pos, np.arange(prices.shape[1])]
+        can_normalize = valid.any(axis=0) & (first_val != 0)
+        prices *= np.where(can_normalize, 100.0, 1.0)
+        prices /= np.where(can_normalize, first_val, 1.0)
+
+    returns = gap_returns(prices)
+    drawdown = underwater(prices)
+
     # Calculate metrics
-    metrics = {}
-    for col in normalized_df.columns:
-        metrics[col] = calculate_metrics(normalized_df[col])
-        
-    return normalized_df, pd.DataFrame(metrics).T
+    metrics_df = calculate_metrics_matrix(prices, raw_data.index, returns=returns, drawdown=drawdown)
+    metrics_df.index = pd.MultiIndex.from_product([denominators, names[:n_assets]], names=["Denominator", "Asset"])
+
+    return DenominatedData(raw_data.index, names[:n_assets], denominators, prices, returns, drawdown, metrics_df)
@@ -0,0 +1,263 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import gold_loader
+import gold_processor
+
+# Persisted running statistics, one entry per "<asset>|<denomination>"
+METRICS_STATE_PATH = "data/state/metrics.json"
+
+# Extra days read before the oldest state's last bar when extending, so gold / FX
+# closes forward-fill onto the first new bars as they would over the full history
+EXTEND_LOOKBACK_DAYS = 10
+
+class MetricsState:
+    """
+    Running CAGR / volatility / max drawdown inputs for one asset in one denomination.
+
+    Returns are folded in with the parallel (Chan et al.) form of Welford's
+    algorithm, so appending k bars costs O(k) no matter how long the history is.
+    metrics() reproduces gold_processor.calculate_metrics on the full series.
+
+    Values are plain prices in gold (not normalized), so bars computed from any
+    later window of the raw data line up with the stored ones. `sources` records
+    the first stored date of each input series (asset, gold, FX); a change means
+    history was backfilled and the state must be rebuilt.
+    """
+
+    FIELDS = ["first_date", "first_value", "last_date", "last_value", "count",
+              "n_returns", "mean", "m2", "running_max", "max_drawdown", "sources"]
+
+    def __init__(self):
+        self.first_date = None
+        self.first_value = None
+        self.last_date = None
+        self.last_value = None
+        self.count = 0
+        self.n_returns = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.running_max = None
+        self.max_drawdown = 0.0
+        self.sources = None
+
+    def is_consistent_with(self, clean_series):
+        """
+        False if the stored history no longer matches the series (backfill or revision).
+        A series starting after first_date is a window of the history and is only
+        checked at last_date.
+        """
+        if self.count == 0:
+            return True
+        if clean_series.empty or clean_series.index[0] < pd.Timestamp(self.first_date):
+            return False
+        if clean_series.index[0] == pd.Timestamp(self.first_date) and not np.isclose(
+            clean_series.iloc[0], self.first_value, rtol=1e-12, atol=0
+        ):
+            return False
+        last_date = pd.Timestamp(self.last_date)
+        if last_date not in clean_series.index:
+            return False
+        return np.isclose(clean_series.loc[last_date], self.last_value, rtol=1e-12, atol=0)
+
+    def update(self, clean_series):
+        """Folds in the bars after last_date. Returns the number of bars consumed."""
+        if self.last_date is not None:
+            clean_series = clean_series.loc[clean_series.index > pd.Timestamp(self.last_date)]
+        if clean_series.empty:
+            return 0
+
+        values = clean_series.to_numpy(dtype="float64")
+        if self.count == 0:
+            self.first_date = clean_series.index[0].isoformat()
+            self.first_value = float(values[0])
+            self.running_max = float(values[0])
+            chain = values
+        else:
+            chain = np.concatenate([[self.last_value], values])
+
+        # Returns: merge the chunk's mean / M2 into the running totals
+        returns = chain[1:] / chain[:-1] - 1
+        if len(returns):
+            n_b = len(returns)
+            mean_b = returns.mean()
+            m2_b = ((returns - mean_b) ** 2).sum()
+            n = self.n_returns + n_b
+            delta = mean_b - self.mean
+            self.mean += delta * n_b / n
+            self.m2 += m2_b + delta ** 2 * self.n_returns * n_b / n
+            self.n_returns = n
+
+        # Drawdown against the running max carried over from earlier bars
+        rolling_max = np.maximum.accumulate(np.concatenate([[self.running_max], values]))[1:]
+        drawdown = (values - rolling_max) / rolling_max
+        self.max_drawdown = min(self.max_drawdown, float(drawdown.min()))
+        self.running_max = float(rolling_max[-1])
+
+        self.count += len(values)
+        self.last_date = clean_series.index[-1].isoformat()
+        self.last_value = float(values[-1])
+        return len(values)
+
+    def metrics(self):
+        """CAGR / Volatility / Max Drawdown, matching calculate_metrics."""
+        if self.count < 2:
+            return {"CAGR": 0.0, "Volatility": 0.0, "Max Drawdown": 0.0}
+
+        years = (pd.Timestamp(self.last_date) - pd.Timestamp(self.first_date)).days / 365.25
+        if years <= 0 or self.first_value == 0:
+            cagr = 0.0
+        else:
+            cagr = (self.last_value / self.first_value) ** (1 / years) - 1
+
+        if self.n_returns < 2:
+            volatility = np.nan
+        else:
+            volatility = np.sqrt(self.m2 / (self.n_returns - 1)) * np.sqrt(252)
+
+        return {"CAGR": cagr, "Volatility": volatility, "Max Drawdown": self.max_drawdown}
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        for field in cls.FIELDS:
+            setattr(state, field, data.get(field, getattr(state, field)))
+        return state
+
+class MetricsStore:
+    """JSON file of MetricsState entries keyed by asset and denomination."""
+
+    def __init__(self, path=METRICS_STATE_PATH):
+        self.path = path
+        self.states = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.states = {k: MetricsState.from_dict(v) for k, v in json.load(f).items()}
+
+    @staticmethod
+    def key(asset_name, denomination="GOLD"):
+        return f"{asset_name}|{denomination}"
+
+    def get(self, asset_name, denomination="GOLD"):
+        return self.states.get(self.key(asset_name, denomination))
+
+    def update(self, asset_name, series, denomination="GOLD", sources=None):
+        """
+        Brings an asset's state up to date with `series` (full history, prices in
+        gold). Only new bars are processed unless the stored history was rewritten.
+        Returns (state, bars_consumed, rebuilt).
+        """
+        clean = series.dropna()
+        key = self.key(asset_name, denomination)
+        state = self.states.get(key)
+        rebuilt = state is None or state.sources != sources or not state.is_consistent_with(clean)
+        if rebuilt:
+            state = MetricsState()
+            state.sources = sources
+        consumed = state.update(clean)
+        self.states[key] = state
+        return state, consumed, rebuilt
+
+    def extend(self, asset_name, window, denomination="GOLD"):
+        """
+        Folds in the bars of `window` (a recent slice of the history reaching back to
+        at least the state's last bar) after last_date. Returns the bars consumed, or
+        None if the window disagrees with the state (the caller rebuilds from the
+        full history).
+        """
+        state = self.get(asset_name, denomination)
+        clean = window.dropna()
+        if state is None or state.count == 0 or not state.is_consistent_with(clean):
+            return None
+        return state.update(clean)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({k: v.to_dict() for k, v in self.states.items()}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+def check_consistency(state, series):
+    """Full recompute via calculate_metrics; returns {metric: (incremental, full)} for mismatches."""
+    full = gold_processor.calculate_metrics(series)
+    incremental = state.metrics()
+    return {
+        name: (incremental[name], full[name])
+        for name in full
+        if not np.isclose(incremental[name], full[name], rtol=1e-9, atol=1e-12, equal_nan=True)
+    }
+
+def asset_inputs(asset_name):
+    """The asset plus the gold and FX series its gold price is computed from."""
+    return list(dict.fromkeys(["GOLD"] + gold_loader.get_required_fx_assets([asset_name]) + [asset_name]))
+
+def gold_denominated_history(asset_name, start="1900-01-01"):
+    """
+    Prices in gold (not normalized) of one asset from `start`, read with only its
+    own inputs, so the calendar (and any forward fill) never depends on which other
+    assets are refreshed alongside it. Empty if the asset has no data.
+    """
+    ticker_map = gold_loader.get_ticker_map()
+    inputs = {a: ticker_map[a] for a in asset_inputs(asset_name) if a in ticker_map}
+    raw = gold_loader.get_close_prices(list(inputs.values()), start, "2100-01-01")
+    if raw.empty:
+        return pd.Series(dtype="float64")
+    result = gold_processor.process_prices(
+        raw, inputs, gold_loader.CURRENCY_MAPPING, gold_loader.FX_PAIRS, assets=[asset_name], normalize=False,
+    )
+    return result.normalized[asset_name] if asset_name in result.normalized.columns else pd.Series(dtype="float64")
+
+def input_spans(asset_name):
+    """Stored (first, last) dates of every series an asset's gold price is computed from."""
+    ticker_map = gold_loader.get_ticker_map()
+    spans = {}
+    for name in asset_inputs(asset_name):
+        ticker = ticker_map.get(name)
+        if ticker is not None and ticker != "USD":
+            spans[ticker] = gold_loader.get_stored_span(ticker)
+    return spans
+
+def refresh_all(store=None, verify=False):
+    """
+    Updates the persisted gold-denominated metrics for every asset from its latest bars.
+
+    States whose inputs were not backfilled are extended from a short window read
+    from just before their last bar (O(new bars)); only new, backfilled or revised
+    assets are recomputed from their full history. Each asset is read with its own
+    inputs only, and bars are consumed only up to the last date every input has
+    data for, so forward-filled values are never stored. With `verify`, each state
+    is also checked against a full recompute.
+    Returns {asset: (bars_consumed, rebuilt, mismatches)}.
+    """
+    store = store or MetricsStore()
+    report = {}
+    for asset_name in gold_loader.get_ticker_map():
+        spans = input_spans(asset_name)
+        sources = {t: span[0].isoformat() if span else None for t, span in spans.items()}
+        horizon = min((span[1] for span in spans.values() if span), default=None)
+
+        state = store.get(asset_name)
+        consumed = None
+        if state is not None and state.count and state.sources == sources:
+            start = pd.Timestamp(state.last_date) - pd.Timedelta(days=EXTEND_LOOKBACK_DAYS)
+            window = gold_denominated_history(asset_name, start).loc[:horizon]
+            consumed = store.extend(asset_name, window)
+            rebuilt = False
+        if consumed is None:
+            history = gold_denominated_history(asset_name).loc[:horizon]
+            if history.dropna().empty:
+                continue
+            _, consumed, rebuilt = store.update(asset_name, history, sources=sources)
+
+        mismatches = {}
+        if verify:
+            full = gold_denominated_history(asset_name).loc[:horizon].dropna()
+            mismatches = check_consistency(store.get(asset_name), full)
+        report[asset_name] = (consumed, rebuilt, mismatches)
+    store.save()
+    return report
@@ -0,0 +1,151 @@
+import math
+import itertools
+import numpy as np
+import pandas as pd
+import gold_processor
+import profiling
+
+# Calendar rebalancing schedules: pandas period frequency of each
+SCHEDULES = {"monthly": "M", "quarterly": "Q", "yearly": "Y"}
+
+# Drift from target (absolute weight) that triggers a "threshold" rebalance
+DEFAULT_BAND = 0.05
+
+class Backtest:
+    """
+    NAVs of many portfolios over the same (gold-denominated) price history:
+    - nav: (time x portfolio) values, starting at 100
+    - weights: (portfolio x asset) target weights
+    - metrics: CAGR / Volatility / Max Drawdown per portfolio, plus Turnover (sum
+      of traded weight) and Rebalances
+    """
+
+    def __init__(self, nav, weights, metrics):
+        self.nav = nav
+        self.weights = weights
+        self.metrics = metrics
+
+    def best(self, by="CAGR", n=10, ascending=False):
+        """The top `n` portfolios by a metric, with their weights."""
+        top = self.metrics.sort_values(by, ascending=ascending).head(n)
+        return self.weights.loc[top.index].join(top)
+
+def weight_grid(assets, step=0.1):
+    """
+    Every long-only allocation over `assets` in increments of `step` (weights sum
+    to 1), as a (portfolio x asset) DataFrame.
+    """
+    units = int(round(1 / step))
+    n = len(assets)
+    if n == 0:
+        return pd.DataFrame(columns=list(assets))
+    # Stars and bars: n - 1 divider positions among units + n - 1 slots
+    dividers = np.array(list(itertools.combinations(range(units + n - 1), n - 1)), dtype="int64").reshape(-1, n - 1)
+    bounds = np.hstack([np.full((len(dividers), 1), -1), dividers, np.full((len(dividers), 1), units + n - 1)])
+    return pd.DataFrame(np.diff(bounds, axis=1) - 1, columns=list(assets)) / units
+
+def grid_size(n_assets, step=0.1):
+    """Number of portfolios weight_grid would produce."""
+    return math.comb(int(round(1 / step)) + n_assets - 1, n_assets - 1) if n_assets else 0
+
+def _rebalance_rows(index, schedule):
+    """Row positions of the last bar of each calendar period (the final bar excluded)."""
+    if schedule is None:
+        return np.empty(0, dtype="int64")
+    if schedule not in SCHEDULES:
+        raise ValueError(f"Unknown rebalancing schedule {schedule!r} (use {', '.join(SCHEDULES)}, 'threshold' or None).")
+    periods = pd.DatetimeIndex(index).to_period(SCHEDULES[schedule])
+    return np.flatnonzero(periods[1:] != periods[:-1])
+
+def _calendar_nav(growth, weights, rows, cost):
+    """
+    NAVs for rebalancing at fixed `rows`, for every portfolio at once.
+
+    Between rebalances each holding grows with its asset, so the NAV is the
+    last rebalanced value times weights @ (growth since that rebalance). One
+    (time x asset) relative-growth block and a single matrix product give every
+    portfolio's path; only the turnover is evaluated per rebalance date.
+    """
+    n_rows = len(growth)
+    starts = np.r_[0, rows]
+    # Rebalance each row's growth is measured from (the previous one, at a rebalance row)
+    segment = np.maximum(np.searchsorted(starts, np.arange(n_rows), side="left") - 1, 0)
+    # Growth from an implicit start of 1 before row 0, so the first row's return counts
+    growth = np.vstack([np.ones((1, growth.shape[1])), growth])
+    relative = growth[1:] / growth[np.r_[0, rows + 1][segment]]
+    nav = relative @ weights.T
+
+    # At each rebalance the drifted weights are traded back to target
+    turnover = np.empty((len(rows), len(weights)))
+    for i, row in enumerate(rows):
+        drifted = weights * relative[row] / nav[row][:, None]
+        turnover[i] = np.abs(drifted - weights).sum(axis=1)
+
+    factors = nav[rows] * (1 - cost * turnover)
+    level = 100 * np.vstack([np.ones((1, len(weights))), np.cumprod(factors, axis=0)])
+    nav *= level[segment]
+    nav[rows] = level[1:]
+    return nav, turnover.sum(axis=0), np.full(len(weights), len(rows))
+
+def _threshold_nav(growth_step, weights, band, cost):
+    """
+    NAVs when each portfolio is traded back to target as soon as any weight drifts
+    more than `band` from it. The timing depends on each portfolio's own path, so
+    this steps through time once, updating all portfolios per step.
+    """
+    holdings = 100 * weights
+    nav = np.empty((len(growth_step), len(weights)))
+    turnover = np.zeros(len(weights))
+    rebalances = np.zeros(len(weights), dtype="int64")
+    for t, step in enumerate(growth_step):
+        holdings *= step
+        value = holdings.sum(axis=1)
+        drift = np.abs(holdings / value[:, None] - weights)
+        due = (drift > band).any(axis=1)
+        if due.any():
+            traded = drift[due].sum(axis=1)
+            value[due] *= 1 - cost * traded
+            holdings[due] = weights[due] * value[due, None]
+            turnover[due] += traded
+            rebalances += due
+        nav[t] = value
+    return nav, turnover, rebalances
+
+@profiling.timed("portfolio.backtest", input_rows=True)
+def backtest(returns, weights, schedule="monthly", cost=0.0, band=DEFAULT_BAND):
+    """
+    Backtests every row of `weights` over the same returns.
+
+    Inputs:
+    - returns: (time x asset) DataFrame of simple returns, e.g. ProcessedData.returns.
+      NaN (before an asset's history starts, or gaps) counts as 0, so that part of
+      the allocation is held flat.
+    - weights: (portfolio x asset) DataFrame of target weights; assets missing from
+      it get 0. Each row is scaled to sum to 1.
+    - schedule: "monthly", "quarterly", "yearly" (rebalance at each period's last
+      bar), "threshold" (whenever a weight drifts more than `band` from target) or
+      None (buy and hold).
+    - cost: Transaction cost as a fraction of the value traded (0.001 = 10 bps).
+
+    Returns a Backtest with the NAVs and metrics of every portfolio.
+    """
+    weights = weights.reindex(columns=returns.columns, fill_value=0.0).astype("float64")
+    totals = weights.sum(axis=1)
+    if (totals <= 0).any():
+        raise ValueError("Every portfolio needs a positive total weight.")
+    weights = weights.div(totals, axis=0)
+    w = weights.to_numpy()
+
+    step = 1 + np.nan_to_num(returns.to_numpy(dtype="float64"))
+    if schedule == "threshold":
+        nav, turnover, rebalances = _threshold_nav(step, w, band, cost)
+    else:
+        rows = _rebalance_rows(returns.index, schedule)
+        nav, turnover, rebalances = _calendar_nav(np.cumprod(step, axis=0), w, rows, cost)
+
+    metrics_df = gold_processor.calculate_metrics_matrix(nav, returns.index)
+    metrics_df.index = weights.index
+    metrics_df["Turnover"] = turnover
+    metrics_df["Rebalances"] = rebalances
+    nav_df = pd.DataFrame(nav, index=returns.index, columns=weights.index, copy=False)
+    return Backtest(nav_df, weights, metrics_df)
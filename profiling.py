@@ -0,0 +1,148 @@
+import os
+import io
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import threading
+import functools
+import contextlib
+import pandas as pd
+
+# Every finished run appends its spans here (one JSON object per line)
+SPAN_LOG_PATH = "data/logs/spans.jsonl"
+
+# Past this size the log is rotated to <path>.1 (replacing the previous one), so at
+# most about twice this much is kept
+SPAN_LOG_MAX_BYTES = 10 * 1024**2
+
+_local = threading.local()
+
+class Run:
+    """Spans recorded during one dashboard rerun (or any other unit of work)."""
+
+    def __init__(self, profile=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.started = time.time()
+        self.spans = []
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self.profiler = cProfile.Profile() if profile else None
+
+    def add(self, record):
+        with self._lock:
+            self.spans.append(record)
+
+    def elapsed(self):
+        """Seconds since the run started."""
+        return time.perf_counter() - self._t0
+
+    def summary(self):
+        """Per-stage totals: calls, wall time (s) and rows processed."""
+        if not self.spans:
+            return pd.DataFrame(columns=["calls", "wall_s", "rows"])
+        df = pd.DataFrame(self.spans)
+        if "rows" not in df.columns:
+            df["rows"] = None
+        return (
+            df.groupby("name", sort=False)
+            .agg(calls=("wall_s", "size"), wall_s=("wall_s", "sum"), rows=("rows", lambda r: r.sum(min_count=1)))
+            .sort_values("wall_s", ascending=False)
+        )
+
+    def profile_text(self, limit=30):
+        """cProfile output sorted by cumulative time (empty if profiling was off)."""
+        if self.profiler is None:
+            return ""
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+def current_run():
+    """The Run active in this thread, or None."""
+    return getattr(_local, "run", None)
+
+@contextlib.contextmanager
+def attach(run):
+    """Makes `run` active in the current (e.g. worker) thread for the duration of the block."""
+    previous = current_run()
+    _local.run = run
+    try:
+        yield run
+    finally:
+        _local.run = previous
+
+def bind(fn):
+    """Wraps fn so calls from other threads (e.g. a pool) record into the caller's current run."""
+    run = current_run()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with attach(run):
+            return fn(*args, **kwargs)
+    return wrapper
+
+def start_run(profile=False):
+    """Starts recording spans in this thread; with `profile`, also captures cProfile stats."""
+    run = Run(profile=profile)
+    _local.run = run
+    if run.profiler is not None:
+        try:
+            run.profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this process
+            run.profiler = None
+    return run
+
+def finish_run(run, log_path=SPAN_LOG_PATH):
+    """
+    Stops recording and appends the run's spans to `log_path` (None to skip),
+    rotating the log once it exceeds SPAN_LOG_MAX_BYTES.
+    """
+    if run.profiler is not None:
+        run.profiler.disable()
+    if current_run() is run:
+        _local.run = None
+    if log_path and run.spans:
+        try:
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            if os.path.exists(log_path) and os.path.getsize(log_path) > SPAN_LOG_MAX_BYTES:
+                os.replace(log_path, log_path + ".1")
+            with open(log_path, "a") as f:
+                for record in run.spans:
+                    f.write(json.dumps({"run": run.id, "run_started": run.started, **record}, default=str) + "\n")
+        except OSError as e:
+            print(f"Error writing span log {log_path}: {e}")
+    return run
+
+@contextlib.contextmanager
+def span(name, rows=None):
+    """
+    Times a block. The yielded dict can be updated (e.g. record["rows"] = n) before
+    the block ends. A no-op when no run is active.
+    """
+    run = current_run()
+    record = {"name": name, "rows": rows}
+    if run is None:
+        yield record
+        return
+    t0 = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["start_s"] = t0 - run._t0
+        record["wall_s"] = time.perf_counter() - t0
+        record["thread"] = threading.current_thread().name
+        run.add(record)
+
+def timed(name, input_rows=False):
+    """Decorator form of span; with `input_rows`, len() of the first argument is recorded as rows."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            rows = len(args[0]) if input_rows and args else None
+            with span(name, rows=rows):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
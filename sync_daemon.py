@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import datetime
+import argparse
+import pandas as pd
+import gold_loader
+import sync_engine
+import metrics_state
+
+# Change notifications for running dashboards: a version counter bumped after every
+# sync that rewrote asset files, plus the version at which each ticker last changed
+SYNC_STATE_PATH = "data/state/sync_version.json"
+
+# When each asset's daily bar is final: (timezone, local close time, weekdays only).
+# Assets not listed follow DEFAULT_CLOSE.
+MARKET_CLOSES = {
+    "SP500": ("America/New_York", "16:00", True),
+    "NASDAQ": ("America/New_York", "16:00", True),
+    "NIFTY": ("Asia/Kolkata", "15:30", True),
+    "NIKKEI": ("Asia/Tokyo", "15:30", True),
+    # CME / ICE futures and FX roll over at 17:00 New York time
+    "GOLD": ("America/New_York", "17:00", True),
+    "SILVER": ("America/New_York", "17:00", True),
+    "COPPER": ("America/New_York", "17:00", True),
+    "CRUDE_BRENT": ("America/New_York", "17:00", True),
+    "INR": ("America/New_York", "17:00", True),
+    "JPY": ("America/New_York", "17:00", True),
+    "CNY": ("America/New_York", "17:00", True),
+    # Crypto trades around the clock; Yahoo's daily bars end at midnight UTC
+    "BTC": ("UTC", "00:00", False),
+    "ETH": ("UTC", "00:00", False),
+}
+DEFAULT_CLOSE = ("America/New_York", "17:00", True)
+
+# Wait after a close before fetching, so Yahoo has published the final bar
+SETTLE_DELAY = pd.Timedelta(minutes=45)
+
+# Only recent bars are synced; full history is sync_data.py's job
+LOOKBACK_DAYS = 10
+
+# Longest sleep between schedule checks (keeps the daemon responsive to clock changes)
+MAX_SLEEP = 15 * 60
+
+def read_state(path=SYNC_STATE_PATH):
+    """The published sync state: {"version", "tickers", "last_run", "next_run"}."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"version": 0, "tickers": {}, "last_run": None, "next_run": None}
+
+def publish(changed, next_run=None, path=SYNC_STATE_PATH):
+    """Bumps the version if any tickers changed and records the run times. Returns the state."""
+    state = read_state(path)
+    if changed:
+        state["version"] += 1
+        for ticker in changed:
+            state["tickers"][ticker] = state["version"]
+    state["last_run"] = datetime.datetime.now().isoformat(timespec="seconds")
+    state["next_run"] = next_run.isoformat() if next_run is not None else None
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, path)
+    return state
+
+def changed_since(state, version):
+    """Tickers whose files changed after `version`."""
+    return [ticker for ticker, v in state["tickers"].items() if v > version]
+
+def _closes(asset_name, around, step):
+    """Yields the asset's closes (UTC) walking day by day from `around` in direction `step`."""
+    tz, close_time, weekdays_only = MARKET_CLOSES.get(asset_name, DEFAULT_CLOSE)
+    day = around.tz_convert(tz).date()
+    for i in range(-1, 9):
+        date = day + datetime.timedelta(days=step * i)
+        close = pd.Timestamp(f"{date} {close_time}").tz_localize(tz)
+        if not weekdays_only or close.weekday() < 5:
+            yield close.tz_convert("UTC")
+
+def last_close(asset_name, now):
+    """Most recent close of the asset at or before `now` (tz-aware)."""
+    return max(c for c in _closes(asset_name, now, -1) if c <= now)
+
+def next_close(asset_name, now):
+    """First close of the asset after `now` (tz-aware)."""
+    return min(c for c in _closes(asset_name, now, 1) if c > now)
+
+def session_date(asset_name, close):
+    """Trading date whose bar is completed by `close` (a midnight close ends the previous day)."""
+    tz = MARKET_CLOSES.get(asset_name, DEFAULT_CLOSE)[0]
+    return (close.tz_convert(tz) - pd.Timedelta(seconds=1)).date()
+
+def sync_due(asset_names, closes, max_workers=sync_engine.DEFAULT_WORKERS):
+    """
+    Syncs the given assets up to and including the session each `closes[asset]` ended.
+    Returns the tickers whose files changed.
+    """
+    ticker_map = gold_loader.get_ticker_map()
+    by_end = {}
+    for name in asset_names:
+        if ticker_map.get(name, "USD") == "USD":
+            continue
+        # yfinance treats the end date as exclusive
+        end_date = session_date(name, closes[name]) + datetime.timedelta(days=1)
+        by_end.setdefault(end_date, []).append(ticker_map[name])
+
+    changed = []
+    for end_date, tickers in sorted(by_end.items()):
+        before = {t: gold_loader.asset_file_version(t) for t in tickers}
+        start_date = end_date - datetime.timedelta(days=LOOKBACK_DAYS)
+        sync_engine.sync_assets(tickers, start_date, end_date, max_workers=max_workers, settled=True)
+        changed += [t for t in tickers if gold_loader.asset_file_version(t) != before[t]]
+    return changed
+
+def run_once(max_workers=sync_engine.DEFAULT_WORKERS):
+    """Catches every asset up to its latest settled close and publishes the result."""
+    now = pd.Timestamp.now(tz="UTC") - SETTLE_DELAY
+    names = [n for n in gold_loader.get_ticker_map() if n != "USD"]
+    changed = sync_due(names, {n: last_close(n, now) for n in names}, max_workers)
+    if changed:
+        metrics_state.refresh_all()
+    return publish(changed), changed
+
+def run_forever(max_workers=sync_engine.DEFAULT_WORKERS):
+    """Syncs each asset SETTLE_DELAY after every market close, indefinitely."""
+    state, changed = run_once(max_workers)
+    print(f"🛰️ Initial sync: {len(changed)} assets changed (version {state['version']})")
+
+    names = [n for n in gold_loader.get_ticker_map() if n != "USD"]
+    now = pd.Timestamp.now(tz="UTC")
+    closes = {n: next_close(n, now - SETTLE_DELAY) for n in names}
+    publish([], next_run=min(closes.values()) + SETTLE_DELAY)
+    while True:
+        due_at = min(closes.values()) + SETTLE_DELAY
+        now = pd.Timestamp.now(tz="UTC")
+        if now < due_at:
+            time.sleep(min((due_at - now).total_seconds(), MAX_SLEEP))
+            continue
+
+        due = [n for n in names if closes[n] + SETTLE_DELAY <= now]
+        try:
+            changed = sync_due(due, closes, max_workers)
+            if changed:
+                metrics_state.refresh_all()
+        except Exception as e:
+            print(f"Error syncing {', '.join(due)}: {e}")
+            changed = []
+        for name in due:
+            closes[name] = next_close(name, now - SETTLE_DELAY)
+        state = publish(changed, next_run=min(closes.values()) + SETTLE_DELAY)
+        print(f"[{now:%Y-%m-%d %H:%M}Z] Synced {', '.join(due)}: {len(changed)} changed (version {state['version']})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep local asset storage synced after each market close.")
+    parser.add_argument("--once", action="store_true", help="Catch up to the latest closes and exit")
+    parser.add_argument("--workers", type=int, default=sync_engine.DEFAULT_WORKERS, help="Number of tickers fetched in parallel")
+    args = parser.parse_args()
+
+    if args.once:
+        state, changed = run_once(args.workers)
+        print(f"✨ {len(changed)} assets changed (version {state['version']})")
+    else:
+        try:
+            run_forever(args.workers)
+        except KeyboardInterrupt:
+            print("Stopped.")
@@ -1,61 +1,120 @@
 import gold_loader
-import pandas as pd
+import sync_engine
+import metrics_state
 import datetime
 import time
-import random
 import os
+import argparse
 
-def full_sync():
-    print("🚀 Starting Full Historical Sync for all assets...")
+def full_sync(max_workers=sync_engine.DEFAULT_WORKERS, interval=gold_loader.DAILY_INTERVAL):
+    intraday = interval != gold_loader.DAILY_INTERVAL
+    print(f"🚀 Starting Full Historical Sync for all assets ({interval} bars)...")
     
     # 1. Define the full range
-    # Let's go back 25 years to be safe
+    # Let's go back 25 years to be safe (intraday: as far back as Yahoo serves the interval)
     end_date = datetime.date.today()
-    start_date = end_date - datetime.timedelta(days=365*25)
+    lookback = gold_loader.INTERVALS[interval]["lookback_days"] if intraday else 365*25
+    start_date = end_date - datetime.timedelta(days=lookback)
     
     ticker_map = gold_loader.get_ticker_map()
     all_friendly_names = sorted(list(ticker_map.keys()))
+    names_by_ticker = {ticker_map[name]: name for name in all_friendly_names}
     
     print(f"Target Period: {start_date} to {end_date}")
-    print(f"Total Assets to Sync: {len(all_friendly_names)}")
+    print(f"Total Assets to Sync: {len(all_friendly_names)} ({max_workers} workers)")
     print("-" * 40)
 
-    # 2. Iterate through each asset and sync
-    for i, name in enumerate(all_friendly_names):
-        ticker = ticker_map[name]
-        if name == "USD":
-            print(f"[{i+1}/{len(all_friendly_names)}] Skipping synthetic asset: {name}")
-            continue
-            
-        print(f"[{i+1}/{len(all_friendly_names)}] Syncing {name} ({ticker})...")
-        
-        try:
-            # fetch_data_with_persistence already handles merging and saving
-            # We call it for each asset specifically to avoid massive batch requests
-            df = gold_loader.fetch_data_with_persistence([ticker], start_date, end_date)
-            
-            if not df.empty:
-                print(f"✅ Success: {len(df)} rows found/updated.")
-            else:
-                print(f"⚠️ Warning: No data returned for {name}.")
-        except Exception as e:
-            print(f"❌ Error syncing {name}: {e}")
-            
-        # Voluntary delay to be nice to Yahoo Finance
-        delay = random.uniform(1.0, 3.0)
-        time.sleep(delay)
+    # 2. Sync all assets concurrently; the shared rate limiter paces the requests
+    tickers = [ticker_map[name] for name in all_friendly_names if name != "USD"]
+    completed = []
+
+    def report(ticker, error):
+        completed.append(ticker)
+        name = names_by_ticker[ticker]
+        prefix = f"[{len(completed)}/{len(tickers)}]"
+        if error is not None:
+            print(f"{prefix} ❌ Error syncing {name}: {error}")
+            return
+        entry = gold_loader.stored_entry(ticker, interval)
+        if entry is not None:
+            print(f"{prefix} ✅ {name} ({ticker}): {entry['rows']} rows stored.")
+        else:
+            print(f"{prefix} ⚠️ Warning: No data returned for {name}.")
+
+    t0 = time.perf_counter()
+    sync_engine.sync_assets(tickers, start_date, end_date, max_workers=max_workers, on_done=report, interval=interval)
+    print(f"Synced {len(tickers)} assets in {time.perf_counter() - t0:.1f}s")
 
     print("-" * 40)
     print("✨ Sync Complete!")
+
+    if intraday:
+        print(f"Storage directory: {os.path.join(gold_loader.ASSETS_DIR, 'intraday', interval)}")
+        return
     
-    if os.path.exists(gold_loader.ASSETS_DIR):
-        files = [f for f in os.listdir(gold_loader.ASSETS_DIR) if f.endswith('.csv')]
-        print(f"Total assets in cache: {len(files)}")
-        for f in files:
-            path = os.path.join(gold_loader.ASSETS_DIR, f)
-            df = pd.read_csv(path, index_col=0)
-            print(f" - {f}: {len(df)} rows")
-        print(f"Storage directory: {gold_loader.ASSETS_DIR}")
+    entries = [e for e in map(gold_loader.stored_entry, sorted(tickers)) if e is not None]
+    print(f"Total assets in cache: {len(entries)}")
+    for entry in entries:
+        print(f" - {entry['ticker']}: {entry['rows']} rows ({entry['first'][:10]} to {entry['last'][:10]})")
+    print(f"Storage directory: {gold_loader.ASSETS_DIR}")
+
+    refresh_metrics()
+
+def refresh_metrics(verify=False):
+    print("📐 Updating gold-denominated metrics state...")
+    store = metrics_state.MetricsStore()
+    report = metrics_state.refresh_all(store, verify=verify)
+    for asset_name, (consumed, rebuilt, mismatches) in sorted(report.items()):
+        mode = "rebuilt" if rebuilt else "incremental"
+        metrics = store.get(asset_name).metrics()
+        line = (f" - {asset_name}: {consumed} new bars ({mode}) | CAGR {metrics['CAGR']:.2%}, "
+                f"Volatility {metrics['Volatility']:.2%}, Max Drawdown {metrics['Max Drawdown']:.2%}")
+        if verify:
+            line += " ✅ matches full recompute" if not mismatches else f" ❌ mismatch: {mismatches}"
+        print(line)
+
+def migrate(fmt="parquet"):
+    print(f"📦 Migrating local asset files to {fmt}...")
+    written = gold_loader.migrate_storage(fmt)
+    for path in written:
+        print(f" - {path}")
+    print(f"✨ Migrated {len(written)} files.")
+    if fmt == "parquet":
+        print("Set GDWA_STORAGE_FORMAT=parquet to load and save assets from the new files.")
+
+def rebuild_catalog():
+    print("🗂️ Rebuilding the asset catalog from the stored files...")
+    count = gold_loader.rebuild_catalog()
+    print(f"✨ Catalogued {count} asset series in {gold_loader.get_catalog_path()}")
+
+def export_csv():
+    print("📤 Exporting all assets to CSV...")
+    for name, ticker in sorted(gold_loader.get_ticker_map().items()):
+        if name == "USD":
+            continue
+        path = gold_loader.export_asset_csv(ticker)
+        if path:
+            print(f" - {name}: {path}")
 
 if __name__ == "__main__":
-    full_sync()
+    parser = argparse.ArgumentParser(description="Sync local asset storage with Yahoo Finance.")
+    parser.add_argument("--migrate", action="store_true", help="Convert existing CSV files (daily and intraday partitions) to Parquet and exit")
+    parser.add_argument("--export-csv", action="store_true", help="Write every asset back out as CSV and exit")
+    parser.add_argument("--rebuild-catalog", action="store_true", help="Re-catalog every stored asset file and exit")
+    parser.add_argument("--check-metrics", action="store_true", help="Update the metrics state and compare it with a full recompute")
+    parser.add_argument("--workers", type=int, default=sync_engine.DEFAULT_WORKERS, help="Number of tickers fetched in parallel")
+    parser.add_argument("--interval", default=gold_loader.DAILY_INTERVAL,
+                        choices=[gold_loader.DAILY_INTERVAL] + list(gold_loader.INTERVALS),
+                        help="Bar interval to sync (intraday bars go to partitioned storage)")
+    args = parser.parse_args()
+
+    if args.migrate:
+        migrate("parquet")
+    elif args.export_csv:
+        export_csv()
+    elif args.rebuild_catalog:
+        rebuild_catalog()
+    elif args.check_metrics:
+        refresh_metrics(verify=True)
+    else:
+        full_sync(max_workers=args.workers, interval=args.interval)
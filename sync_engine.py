@@ -0,0 +1,137 @@
+import concurrent.futures
+import pandas as pd
+import gold_loader
+
+# Number of sync jobs run in parallel. The shared rate limiter, not the pool size,
+# decides how fast requests actually go out.
+DEFAULT_WORKERS = 4
+
+# Missing ranges closer than this are fetched by the same batched download
+# (e.g. a crypto tail starting on Sunday and an index tail starting on Saturday).
+COALESCE_GAP = pd.Timedelta(days=5)
+
+def plan_batches(ranges_by_ticker, gap=COALESCE_GAP):
+    """
+    Groups per-ticker missing ranges into batched downloads.
+
+    Returns a list of jobs; each job is a list of (fetch_start, fetch_end, {ticker: [ranges]})
+    downloads that run one after another. Ranges that overlap (within `gap`) share one
+    download, and all ranges of a ticker land in the same job so no two jobs ever
+    write the same asset file.
+    """
+    items = sorted(
+        (start, end, ticker)
+        for ticker, ranges in ranges_by_ticker.items()
+        for start, end in ranges
+    )
+
+    # Merge overlapping ranges into download windows
+    windows = []
+    for start, end, ticker in items:
+        if windows and start <= windows[-1]["end"] + gap:
+            window = windows[-1]
+            window["end"] = max(window["end"], end)
+        else:
+            window = {"start": start, "end": end, "ranges": {}}
+            windows.append(window)
+        window["ranges"].setdefault(ticker, []).append((start, end))
+
+    # Union-find over windows that share a ticker
+    parent = list(range(len(windows)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    first_window = {}
+    for i, window in enumerate(windows):
+        for ticker in window["ranges"]:
+            if ticker in first_window:
+                parent[find(i)] = find(first_window[ticker])
+            else:
+                first_window[ticker] = i
+
+    jobs = {}
+    for i, window in enumerate(windows):
+        jobs.setdefault(find(i), []).append((window["start"], window["end"], window["ranges"]))
+    return list(jobs.values())
+
+def _run_batch_job(job, start_dt, end_dt, downloader, limiter):
+    """Runs one job's batched downloads, falling back to single-ticker syncs for failures."""
+    failed = set()
+    for fetch_start, fetch_end, ranges in job:
+        data = gold_loader.retry_yf_download(
+            sorted(ranges), fetch_start, fetch_end, downloader=downloader, limiter=limiter
+        )
+        for ticker, ticker_ranges in ranges.items():
+            frame = gold_loader.extract_ticker_frame(data, ticker)
+            if frame.empty:
+                failed.add(ticker)
+                continue
+            # Keep only the rows this ticker was actually missing
+            parts = [frame.loc[s:e] for s, e in ticker_ranges]
+            frame = pd.concat(parts) if len(parts) > 1 else parts[0]
+            if not frame.empty:
+                gold_loader.save_asset_data(ticker, frame)
+
+    for ticker in sorted(failed):
+        gold_loader.sync_asset(ticker, start_dt, end_dt, downloader, limiter)
+    return sorted({t for _, _, ranges in job for t in ranges})
+
+def sync_assets(tickers, start_date, end_date, max_workers=DEFAULT_WORKERS,
+                downloader=None, limiter=None, on_done=None, batch=True,
+                interval=gold_loader.DAILY_INTERVAL, settled=False):
+    """
+    Syncs several tickers concurrently on a thread pool.
+
+    With `batch` on, tickers whose missing ranges overlap are fetched in one
+    multi-ticker download (see plan_batches); a ticker missing from a batch result
+    is retried on its own. All workers share one RateLimiter
+    (gold_loader.RATE_LIMITER by default), so the total request rate adapts to the
+    provider's limits instead of being a sum of fixed sleeps. `downloader` stands in
+    for yf.download (e.g. a local fake). `on_done(ticker, error)` is called from the
+    calling thread as each ticker finishes, which makes it safe to update Streamlit
+    widgets from it. Intraday intervals are synced per ticker, since Yahoo caps the
+    span of each intraday request (see gold_loader.INTERVALS). `settled` syncs up to
+    end_date as given (see gold_loader.resolve_sync_window).
+
+    Returns a dict of ticker -> None on success, or the exception raised.
+    """
+    start_dt, end_dt = gold_loader.resolve_sync_window(start_date, end_date, interval, settled)
+    batch = batch and interval == gold_loader.DAILY_INTERVAL
+    limiter = limiter or gold_loader.RATE_LIMITER
+    tickers = [t for t in dict.fromkeys(tickers) if t != "USD"]
+
+    results = {}
+    if not tickers:
+        return results
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        if batch:
+            ranges_by_ticker = {t: gold_loader.get_missing_ranges(t, start_dt, end_dt) for t in tickers}
+            for job in plan_batches({t: r for t, r in ranges_by_ticker.items() if r}):
+                job_tickers = sorted({t for _, _, ranges in job for t in ranges})
+                futures[pool.submit(_run_batch_job, job, start_dt, end_dt, downloader, limiter)] = job_tickers
+            # Already up to date: nothing to fetch
+            for ticker, ranges in ranges_by_ticker.items():
+                if not ranges:
+                    results[ticker] = None
+                    if on_done:
+                        on_done(ticker, None)
+        else:
+            for ticker in tickers:
+                future = pool.submit(gold_loader.sync_asset, ticker, start_dt, end_dt, downloader, limiter, interval)
+                futures[future] = [ticker]
+
+        for future in concurrent.futures.as_completed(futures):
+            error = future.exception()
+            for ticker in futures[future]:
+                if error is not None:
+                    print(f"Error syncing {ticker}: {error}")
+                results[ticker] = error
+                if on_done:
+                    on_done(ticker, error)
+    return results
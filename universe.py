@@ -0,0 +1,81 @@
+import concurrent.futures
+import numpy as np
+import pandas as pd
+import gold_loader
+import profiling
+
+# OHLCV fields an asset file may hold
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+class Universe:
+    """
+    OHLCV for many assets on one shared calendar, stored as one contiguous
+    (dates x tickers) array per field instead of a DataFrame per asset, optionally
+    in float32.
+
+    Date windows and runs of adjacent tickers come back as views sharing the
+    parent's memory; frame() wraps a field as a DataFrame without copying it.
+    """
+
+    def __init__(self, dates, tickers, fields):
+        self.dates = dates
+        self.tickers = list(tickers)
+        self.fields = fields
+        self._pos = {t: i for i, t in enumerate(self.tickers)}
+
+    @classmethod
+    def load(cls, tickers, start=None, end=None, fields=("Close",), dtype="float64"):
+        """Reads only `fields` over [start, end] of each ticker (files in parallel)."""
+        tickers = [t for t in dict.fromkeys(tickers) if t != "USD"]
+        read = profiling.bind(gold_loader.read_asset_window)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=gold_loader.LOAD_WORKERS) as pool:
+            frames = list(pool.map(lambda t: read(t, start, end, columns=list(fields)), tickers))
+        return cls.from_frames(dict(zip(tickers, frames)), fields, dtype)
+
+    @classmethod
+    def from_frames(cls, frames, fields=("Close",), dtype="float64"):
+        """Packs {ticker: OHLCV frame} onto the union of their dates (NaN where a ticker has no bar)."""
+        frames = {t: df[~df.index.duplicated(keep="last")] for t, df in frames.items() if not df.empty}
+        stamps = [df.index.as_unit("ns").asi8 for df in frames.values()]
+        dates = np.unique(np.concatenate(stamps)) if stamps else np.empty(0, dtype="int64")
+
+        arrays = {f: np.full((len(dates), len(frames)), np.nan, dtype=dtype) for f in fields}
+        for i, (df, rows) in enumerate(zip(frames.values(), stamps)):
+            positions = dates.searchsorted(rows)
+            for f in fields:
+                if f in df.columns:
+                    arrays[f][positions, i] = df[f].to_numpy()
+        return cls(pd.DatetimeIndex(dates.view("datetime64[ns]"), name="Date"), frames, arrays)
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the field arrays plus the shared calendar."""
+        return sum(a.nbytes for a in self.fields.values()) + self.dates.nbytes
+
+    def window(self, start=None, end=None):
+        """The [start, end] rows as a view."""
+        lo = 0 if start is None else self.dates.searchsorted(pd.Timestamp(start), side="left")
+        hi = len(self.dates) if end is None else self.dates.searchsorted(pd.Timestamp(end), side="right")
+        return Universe(self.dates[lo:hi], self.tickers, {f: a[lo:hi] for f, a in self.fields.items()})
+
+    def select(self, tickers):
+        """
+        The given tickers (missing ones are dropped). Adjacent tickers in stored
+        order are returned as a view; any other selection is copied.
+        """
+        cols = [self._pos[t] for t in tickers if t in self._pos]
+        if cols and cols == list(range(cols[0], cols[0] + len(cols))):
+            key = slice(cols[0], cols[0] + len(cols))
+        else:
+            key = cols
+        return Universe(self.dates, [self.tickers[c] for c in cols], {f: a[:, key] for f, a in self.fields.items()})
+
+    def frame(self, field="Close"):
+        """One field as a (dates x tickers) DataFrame backed by the same memory."""
+        return pd.DataFrame(self.fields[field], index=self.dates, columns=self.tickers, copy=False)
+
+    def astype(self, dtype):
+        return Universe(self.dates, self.tickers, {f: a.astype(dtype, copy=False) for f, a in self.fields.items()})
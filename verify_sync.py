@@ -0,0 +1,255 @@
+import os
+import shutil
+import tempfile
+import threading
+import pandas as pd
+import numpy as np
+import gold_loader
+import gold_processor
+import metrics_state
+import sync_engine
+
+START = pd.Timestamp("2024-01-01")
+END = pd.Timestamp("2024-03-29")
+
+class FakeYahoo:
+    """
+    Stands in for yf.download: serves deterministic daily bars for any ticker in
+    [start, end] (inclusive) as (Price, Ticker) MultiIndex columns, records every
+    request, and can leave tickers out of multi-ticker results or answer the first
+    requests with a rate-limit error.
+    """
+
+    def __init__(self, drop_from_batch=(), rate_limited=0):
+        self.calls = []
+        self.drop_from_batch = set(drop_from_batch)
+        self.rate_limited = rate_limited
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def bars(ticker, start=START, end=END):
+        dates = pd.bdate_range(start, end, name="Date")
+        # Distinct, date-dependent prices per ticker so a mixed-up split back shows up
+        base = 100.0 + 10 * (sum(map(ord, ticker)) % 17)
+        close = base + (dates - START).days.to_numpy() / 10.0
+        return pd.DataFrame(
+            {"Close": close, "High": close + 1, "Low": close - 1, "Open": close, "Volume": 1000},
+            index=dates,
+        )
+
+    def __call__(self, tickers, start=None, end=None, **kwargs):
+        with self._lock:
+            self.calls.append((list(tickers), pd.Timestamp(start), pd.Timestamp(end)))
+            if self.rate_limited:
+                self.rate_limited -= 1
+                raise Exception("Too Many Requests. Rate limited. Try after a while.")
+        served = [t for t in tickers if len(tickers) == 1 or t not in self.drop_from_batch]
+        frames = {t: self.bars(t, start, end) for t in served}
+        return pd.concat(frames, axis=1).swaplevel(axis=1).sort_index(axis=1)
+
+class FakeLimiter:
+    """RateLimiter stand-in that never sleeps and records rate-limit cooldowns."""
+
+    def __init__(self):
+        self.cooldowns = []
+        self.successes = 0
+
+    def acquire(self):
+        pass
+
+    def on_success(self):
+        self.successes += 1
+
+    def on_rate_limited(self, cooldown):
+        self.cooldowns.append(cooldown)
+
+def use_temp_store():
+    """Points gold_loader at an empty CSV store in a fresh temporary directory."""
+    root = tempfile.mkdtemp(prefix="gdwa_sync_")
+    gold_loader.ASSETS_DIR = os.path.join(root, "assets")
+    gold_loader.STORAGE_FORMAT = "csv"
+    gold_loader.clear_asset_cache()
+    return root
+
+def assert_stored(ticker, start=START, end=END, lookup=gold_loader.catalog_entry):
+    """The stored file (and its catalog entry) holds exactly the fake's bars over [start, end]."""
+    expected = FakeYahoo.bars(ticker, start, end)
+    stored = gold_loader.load_asset_data(ticker)
+    assert list(stored.index) == list(expected.index), f"{ticker}: stored dates differ"
+    assert np.allclose(stored["Close"], expected["Close"]), f"{ticker}: stored closes differ"
+    window = gold_loader.read_asset_window(ticker, start, end, columns=["Close"])
+    assert np.allclose(window["Close"], expected["Close"]), f"{ticker}: windowed read differs"
+    entry = lookup(ticker)
+    assert entry is not None and entry["rows"] == len(expected), f"{ticker}: catalog out of date"
+
+def sync(tickers, fake, limiter, start=START, end=END):
+    results = sync_engine.sync_assets(tickers, start, end, max_workers=2, downloader=fake,
+                                      limiter=limiter, settled=True)
+    assert all(error is None for error in results.values()), f"Sync errors: {results}"
+
+def test_batched_download():
+    root = use_temp_store()
+    fake, limiter = FakeYahoo(), FakeLimiter()
+    sync(["AAA", "BBB", "CCC"], fake, limiter)
+    assert len(fake.calls) == 1, f"Expected one batched download, got {fake.calls}"
+    assert sorted(fake.calls[0][0]) == ["AAA", "BBB", "CCC"]
+    for ticker in ["AAA", "BBB", "CCC"]:
+        assert_stored(ticker)
+
+    # Nothing missing: no request at all
+    sync(["AAA", "BBB", "CCC"], fake, limiter)
+    assert len(fake.calls) == 1, "Up-to-date assets were downloaded again"
+    shutil.rmtree(root)
+    print("Batched Download / Split Back Check: PASSED")
+
+def test_single_ticker_fallback():
+    root = use_temp_store()
+    fake, limiter = FakeYahoo(drop_from_batch={"BBB"}), FakeLimiter()
+    sync(["AAA", "BBB", "CCC"], fake, limiter)
+    requested = [tickers for tickers, _, _ in fake.calls]
+    assert requested == [["AAA", "BBB", "CCC"], ["BBB"]], f"Unexpected requests: {requested}"
+    for ticker in ["AAA", "BBB", "CCC"]:
+        assert_stored(ticker)
+    shutil.rmtree(root)
+    print("Single-Ticker Fallback Check: PASSED")
+
+def test_rate_limit_backoff():
+    root = use_temp_store()
+    fake, limiter = FakeYahoo(rate_limited=2), FakeLimiter()
+    sync(["AAA", "BBB"], fake, limiter)
+    assert len(fake.calls) == 3, f"Expected two rate-limited attempts and a retry, got {len(fake.calls)}"
+    assert len(limiter.cooldowns) == 2 and limiter.cooldowns[1] > limiter.cooldowns[0] > 0, \
+        f"Cooldowns should grow: {limiter.cooldowns}"
+    assert limiter.successes == 1
+    assert_stored("AAA")
+    assert_stored("BBB")
+    shutil.rmtree(root)
+    print("Rate-Limit Backoff Check: PASSED")
+
+def test_append_prepend_journal():
+    root = use_temp_store()
+    fake, limiter = FakeYahoo(), FakeLimiter()
+    middle_start, middle_end = pd.Timestamp("2024-02-01"), pd.Timestamp("2024-02-29")
+    sync(["AAA"], fake, limiter, middle_start, middle_end)
+    path = gold_loader.get_asset_path("AAA")
+
+    # Missing head and tail: prepended and appended in place, never rewritten by a full merge
+    used = []
+    originals = {name: getattr(gold_loader, name) for name in ["_append_csv_rows", "_prepend_csv_rows", "_write_asset_file"]}
+
+    def spy(name):
+        def wrapper(*args):
+            used.append(name)
+            return originals[name](*args)
+        return wrapper
+
+    for name in originals:
+        setattr(gold_loader, name, spy(name))
+    try:
+        sync(["AAA"], fake, limiter)
+    finally:
+        for name, original in originals.items():
+            setattr(gold_loader, name, original)
+    assert sorted(used) == ["_append_csv_rows", "_prepend_csv_rows"], f"Unexpected write paths: {used}"
+    assert_stored("AAA")
+
+    # An append interrupted after its journal was written: the file is rolled back,
+    # but only once no writer holds the file's lock
+    intact = open(path, "rb").read()
+    with open(path + ".journal", "w") as f:
+        f.write(str(len(intact)))
+    with open(path, "ab") as f:
+        f.write(b"2024-04-01,1.0,1.0")
+    with gold_loader._write_lock(path):
+        gold_loader._recover_journal(path)
+        assert os.path.exists(path + ".journal"), "Journal recovered while a writer held the lock"
+    gold_loader.clear_asset_cache()
+    # The rollback rewrote the file behind the catalog's back: it is re-catalogued on lookup
+    assert_stored("AAA", lookup=gold_loader.stored_entry)
+    assert not os.path.exists(path + ".journal") and open(path, "rb").read() == intact, "Interrupted append not rolled back"
+
+    # The next sync appends cleanly after the recovered tail
+    later_end = pd.Timestamp("2024-04-30")
+    sync(["AAA"], fake, limiter, START, later_end)
+    assert_stored("AAA", START, later_end)
+    shutil.rmtree(root)
+    print("Append / Prepend / Journal Check: PASSED")
+
+def test_metrics_state_calendar():
+    """
+    Weekday assets refreshed next to a crypto asset (bars every day) must keep
+    their own calendar, whether their state is extended or rebuilt.
+    """
+    root = use_temp_store()
+    saved_tickers = gold_loader.ASSET_TICKERS
+    gold_loader.ASSET_TICKERS = {"GOLD": "GC=F", "SP500": "^GSPC", "BTC": "BTC-USD", "USD": "USD"}
+    try:
+        rng = np.random.default_rng(7)
+        weekdays = pd.bdate_range("2023-01-02", "2023-06-30", name="Date")
+        every_day = pd.date_range("2023-01-01", "2023-06-30", name="Date")
+        frames = {
+            "GC=F": pd.DataFrame({"Close": 1800 * np.cumprod(1 + rng.normal(0, 0.01, len(weekdays)))}, index=weekdays),
+            "^GSPC": pd.DataFrame({"Close": 4000 * np.cumprod(1 + rng.normal(0, 0.012, len(weekdays)))}, index=weekdays),
+            "BTC-USD": pd.DataFrame({"Close": 20000 * np.cumprod(1 + rng.normal(0, 0.03, len(every_day)))}, index=every_day),
+        }
+        cutoff = pd.Timestamp("2023-04-14")
+        for ticker, frame in frames.items():
+            gold_loader.save_asset_data(ticker, frame.loc[:cutoff])
+        store = metrics_state.MetricsStore(os.path.join(root, "metrics.json"))
+        metrics_state.refresh_all(store)
+
+        # BTC is rebuilt from scratch while GOLD / SP500 / USD are extended
+        del store.states[store.key("BTC")]
+        for ticker, frame in frames.items():
+            gold_loader.save_asset_data(ticker, frame.loc[cutoff + pd.Timedelta(days=1):])
+        report = metrics_state.refresh_all(store, verify=True)
+        assert report["BTC"][1] and not report["SP500"][1], f"Unexpected refresh modes: {report}"
+        for asset_name, (_, _, mismatches) in report.items():
+            assert not mismatches, f"{asset_name} differs from a full recompute: {mismatches}"
+
+        # SP500 in gold on its own (weekday) calendar, independently of the refresh
+        expected = gold_processor.calculate_metrics(frames["^GSPC"]["Close"] / frames["GC=F"]["Close"])
+        actual = store.get("SP500").metrics()
+        for name, value in expected.items():
+            assert np.isclose(actual[name], value, rtol=1e-9), f"SP500 {name}: {actual[name]} vs {value}"
+    finally:
+        gold_loader.ASSET_TICKERS = saved_tickers
+    shutil.rmtree(root)
+    print("Metrics State Calendar Check: PASSED")
+
+def test_partition_migration():
+    """Stray files in a partition directory are ignored; --migrate converts intraday partitions too."""
+    root = use_temp_store()
+    saved_tickers = gold_loader.ASSET_TICKERS
+    gold_loader.ASSET_TICKERS = {"GOLD": "GC=F", "USD": "USD"}
+    try:
+        bars = pd.DataFrame({"Close": np.arange(1.0, 7.0)},
+                            index=pd.date_range("2024-01-31 14:00", periods=6, freq="12h", tz="UTC", name="Date"))
+        gold_loader.save_asset_data("GC=F", bars, interval="1m")
+        folder = gold_loader.get_partition_dir("GC=F", "1m")
+        for stray in ["notes.csv", "2024-01.csv.abc123.tmp", "2024-1.csv"]:
+            open(os.path.join(folder, stray), "w").close()
+        assert list(map(str, gold_loader._list_partitions("GC=F", "1m"))) == ["2024-01", "2024-02"]
+        assert len(gold_loader.load_asset_data("GC=F", interval="1m")) == len(bars)
+
+        if gold_loader.HAS_PARQUET:
+            written = gold_loader.migrate_storage("parquet")
+            assert sorted(os.path.basename(p) for p in written) == ["2024-01.parquet", "2024-02.parquet"], written
+            gold_loader.STORAGE_FORMAT = "parquet"
+            gold_loader.clear_asset_cache()
+            assert all(p.endswith(".parquet") for p in gold_loader._list_partitions("GC=F", "1m").values())
+            assert np.allclose(gold_loader.load_asset_data("GC=F", interval="1m")["Close"], bars["Close"])
+            assert gold_loader.catalog_entry("GC=F", "1m")["rows"] == len(bars), "Migrated partitions not catalogued"
+    finally:
+        gold_loader.ASSET_TICKERS = saved_tickers
+    shutil.rmtree(root)
+    print("Partition Listing / Migration Check: PASSED")
+
+if __name__ == "__main__":
+    test_batched_download()
+    test_single_ticker_fallback()
+    test_rate_limit_backoff()
+    test_append_prepend_journal()
+    test_metrics_state_calendar()
+    test_partition_migration()
+    print("Sync Verification Completed Successfully.")
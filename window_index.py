@@ -0,0 +1,162 @@
+import warnings
+import numpy as np
+import pandas as pd
+import gold_processor
+import profiling
+
+METRICS = ("CAGR", "Volatility", "Max Drawdown")
+
+class WindowIndex:
+    """
+    Precomputed per-asset indexes over a (time x asset) price block, answering
+    CAGR / Volatility / Max Drawdown for any [start, end] window without rescanning it:
+    - first / last valid row at or around every row: CAGR in O(1)
+    - prefix sums of returns and squared returns (and their counts): volatility in O(1)
+    - a sparse table of (max, min, worst drawdown) over every power-of-two run of
+      rows: max drawdown in O(log n), combining disjoint runs left to right
+
+    Results match calculate_metrics on the window's prices (NaN gaps skipped the same way).
+    """
+
+    def __init__(self, prices):
+        self.index = prices.index
+        self.assets = list(prices.columns)
+        values = prices.to_numpy(dtype="float64")
+        n_rows = len(values)
+        self._values = values
+        self._dates = np.asarray(self.index, dtype="datetime64[ns]")
+
+        valid = ~np.isnan(values)
+        rows = np.arange(n_rows)[:, None]
+        self._prev_valid = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+        self._next_valid = np.minimum.accumulate(np.where(valid, rows, n_rows)[::-1], axis=0)[::-1]
+
+        # Variance is shift-invariant; centering keeps the prefix sums well conditioned
+        returns = gold_processor.gap_returns(values)
+        has_return = ~np.isnan(returns)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            centered = np.where(has_return, returns - np.nanmean(returns, axis=0), 0.0)
+        self._return_count = self._prefix(has_return.astype("float64"))
+        self._return_sum = self._prefix(centered)
+        self._return_sq_sum = self._prefix(centered * centered)
+
+        # Level k holds runs [i, i + 2**k)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self._levels = [(values, values, np.where(valid, 0.0, np.nan))]
+            width = 1
+            while 2 * width <= n_rows:
+                hi, lo, dd = self._levels[-1]
+                self._levels.append(_combine(
+                    (hi[:-width], lo[:-width], dd[:-width]), (hi[width:], lo[width:], dd[width:])
+                ))
+                width *= 2
+
+    @staticmethod
+    def _prefix(values):
+        """Cumulative sums with a leading zero row: sum of rows [a, b) = p[b] - p[a]."""
+        out = np.zeros((len(values) + 1,) + values.shape[1:])
+        np.cumsum(values, axis=0, out=out[1:])
+        return out
+
+    def rows(self, start=None, end=None):
+        """Inclusive row range [lo, hi] covering the dates [start, end]."""
+        lo = 0 if start is None else int(self.index.searchsorted(pd.Timestamp(start), side="left"))
+        hi = len(self.index) - 1 if end is None else int(self.index.searchsorted(pd.Timestamp(end), side="right")) - 1
+        return lo, hi
+
+    def _max_drawdown(self, first, last):
+        """Worst drawdown over rows [first, last] per cell, via the binary decomposition of the length."""
+        cols = np.broadcast_to(np.arange(len(self.assets)), first.shape)
+        length = np.maximum(last - first + 1, 0)
+        pos = first.copy()
+        acc = None
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for k in range(len(self._levels) - 1, -1, -1):
+                take = (length >> k) & 1 == 1
+                if not take.any():
+                    continue
+                level = self._levels[k]
+                at = np.minimum(pos, len(level[0]) - 1)
+                run = tuple(np.where(take, part[at, cols], np.nan) for part in level)
+                acc = run if acc is None else _combine(acc, run)
+                pos = pos + np.where(take, 1 << k, 0)
+        return np.full(first.shape, np.nan) if acc is None else acc[2]
+
+    def query(self, lo, hi):
+        """
+        Metrics for many row windows at once: `lo` / `hi` are equal-length arrays of
+        inclusive row bounds. Returns {metric: (window x asset) array}.
+        """
+        lo = np.clip(np.asarray(lo, dtype="int64"), 0, max(len(self.index) - 1, 0))[:, None]
+        hi = np.asarray(hi, dtype="int64")[:, None]
+        empty = (hi < lo) | (len(self.index) == 0)
+        hi = np.clip(hi, 0, max(len(self.index) - 1, 0))
+        cols = np.arange(len(self.assets))
+
+        first = self._next_valid[lo, cols]
+        last = self._prev_valid[hi, cols]
+        # Fewer than two valid prices in the window (or none at all)
+        too_short = empty | (last - first < 1)
+        first = np.where(too_short, 0, first)
+        last = np.where(too_short, 0, last)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # CAGR — first/last valid values in the window
+            start_val = self._values[first, cols]
+            end_val = self._values[last, cols]
+            years = ((self._dates[last] - self._dates[first]) // np.timedelta64(1, "D")) / 365.25
+            cagr = (end_val / start_val) ** (1 / years) - 1
+            cagr = np.where((years <= 0) | (start_val == 0) | np.isnan(start_val) | np.isnan(end_val), 0.0, cagr)
+
+            # Volatility — returns on rows (first, last]
+            n = self._return_count[last + 1, cols] - self._return_count[first + 1, cols]
+            s1 = self._return_sum[last + 1, cols] - self._return_sum[first + 1, cols]
+            s2 = self._return_sq_sum[last + 1, cols] - self._return_sq_sum[first + 1, cols]
+            variance = np.maximum(s2 - s1 * s1 / n, 0.0) / (n - 1)
+            volatility = np.where(n < 2, np.nan, np.sqrt(variance) * np.sqrt(252))
+
+        max_drawdown = self._max_drawdown(first, last)
+        return {
+            "CAGR": np.where(too_short, 0.0, cagr),
+            "Volatility": np.where(too_short, 0.0, volatility),
+            "Max Drawdown": np.where(too_short, 0.0, max_drawdown),
+        }
+
+    @profiling.timed("window_index.metrics")
+    def metrics(self, start=None, end=None):
+        """Metrics of every asset over [start, end], like calculate_metrics_matrix on that slice."""
+        lo, hi = self.rows(start, end)
+        result = self.query([lo], [hi])
+        return pd.DataFrame({m: result[m][0] for m in METRICS}, index=self.assets)
+
+    @profiling.timed("window_index.year_grid")
+    def year_grid(self, asset, metric="CAGR"):
+        """
+        `metric` of one asset for every window from the start of one calendar year to
+        the end of another: a (start year x end year) DataFrame, NaN where end < start.
+        """
+        years = self.index.year
+        labels = np.unique(years)
+        first_row = years.searchsorted(labels, side="left")
+        last_row = years.searchsorted(labels, side="right") - 1
+        i, j = np.triu_indices(len(labels))
+        values = self.query(first_row[i], last_row[j])[metric][:, self.assets.index(asset)]
+
+        grid = np.full((len(labels), len(labels)), np.nan)
+        grid[i, j] = values
+        return pd.DataFrame(
+            grid, index=pd.Index(labels, name="Start Year"), columns=pd.Index(labels, name="End Year")
+        )
+
+def _combine(left, right):
+    """(max, min, worst drawdown) of two adjacent runs, `left` first; NaN values are ignored."""
+    left_hi, left_lo, left_dd = left
+    right_hi, right_lo, right_dd = right
+    # A new trough in the right run measured from the peak of the left run
+    cross = (right_lo - left_hi) / left_hi
+    return (
+        np.fmax(left_hi, right_hi),
+        np.fmin(left_lo, right_lo),
+        np.fmin(np.fmin(left_dd, right_dd), cross),
+    )